@@ -1,9 +1,10 @@
 import asyncio
-from pydantic import BaseModel, Field 
 from agents import Agent, Runner 
 from dotenv import load_dotenv
 import os 
 
+from fitness_core import WorkoutPlan
+
 ###########################################################################
 # Load environment variables from .env file
 ###########################################################################
@@ -13,19 +14,6 @@ load_dotenv()
 # set the model name
 model = os.getenv('LLM_MODEL_NAME', 'gpt-4o-mini')
 
-###########################################################################
-# --- Structured Output Model ---
-###########################################################################
-# Define a Pydantic model for the structured output
-
-class WorkoutPlan(BaseModel):
-    """Workout recommendation with exercises and details"""
-    focus_area: str = Field(description="Primary focus of the workout (e.g., 'upper body', 'cardio')")
-    difficulty: str = Field(description="Difficulty level (Beginner, Intermediate, Advanced)")
-    exercises: list[str] = Field(description="List of recommended exercises")
-    notes: str = Field(description="Additional notes or form tips")
-
-
 ###########################################################################
 # --------Simple Fitness Agent --------
 ###########################################################################
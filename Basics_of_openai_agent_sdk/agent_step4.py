@@ -1,34 +1,19 @@
 import asyncio
-from pydantic import BaseModel, Field
-from agents import Agent, Runner, function_tool, InputGuardrail, GuardrailFunctionOutput, InputGuardrailTripwireTriggered
-from typing import List, Optional
+from agents import Agent, Runner, InputGuardrail, GuardrailFunctionOutput, InputGuardrailTripwireTriggered
+from typing import List
 from dataclasses import dataclass
 from dotenv import load_dotenv
 import os
 
+from fitness_core import GoalAnalysis, MealPlan, WorkoutPlan
+from fitness_core import fitness_goal_guardrail as shared_fitness_goal_guardrail
+
 # Load environment variables
 load_dotenv()
 
 # Set model choice
 model = os.getenv('LLM_MODEL_NAME', 'gpt-4o-mini')
 
-# --- Simple Output Models ---
-class WorkoutPlan(BaseModel):
-    """Workout recommendation with exercises and details"""
-    exercises: List[str] = Field(description="List of recommended exercises")
-    notes: str = Field(description="Additional notes or form tips")
-
-class MealPlan(BaseModel):
-    """Basic meal plan recommendation"""
-    daily_calories: int = Field(description="Recommended daily calorie intake")
-    meal_suggestions: List[str] = Field(description="Simple meal ideas")
-    notes: str = Field(description="Dietary advice and tips")
-
-class GoalAnalysis(BaseModel):
-    """Analysis of user fitness goals"""
-    is_realistic: bool = Field(description="Whether the goal is realistic and healthy")
-    reasoning: str = Field(description="Explanation of the analysis")
-
 # --- User Context ---
 @dataclass
 class UserContext:
@@ -38,28 +23,11 @@ class UserContext:
     dietary_preference: str  # Vegan, Vegetarian, No restrictions
     available_equipment: List[str]
 
-# --- Guardrail Agent & Function ---
-goal_analysis_agent = Agent(
-    name="Goal Analyzer",
-    instructions="""
-    You analyze fitness goals to determine if they are realistic and healthy.
-    Losing more than 2 pounds per week is generally considered unsafe.
-    """,
-    output_type=GoalAnalysis,
-    model=model
-)
-
+# --- Guardrail Function ---
 async def fitness_goal_guardrail(ctx, agent, input_data):
-    """Check if the user's fitness goals are realistic and safe."""
+    """Check if the user's fitness goals are realistic and safe, letting the query through if the check fails."""
     try:
-        analysis_prompt = f"The user said: {input_data}.\nAnalyze if their fitness goal is realistic and healthy."
-        result = await Runner.run(goal_analysis_agent, analysis_prompt)
-        final_output = result.final_output_as(GoalAnalysis)
-
-        return GuardrailFunctionOutput(
-            output_info=final_output,
-            tripwire_triggered=not final_output.is_realistic,
-        )
+        return await shared_fitness_goal_guardrail(ctx, agent, input_data)
     except Exception as e:
         return GuardrailFunctionOutput(
             output_info=GoalAnalysis(is_realistic=True, reasoning=f"Error analyzing goal: {str(e)}"),
@@ -138,6 +106,9 @@ async def demo():
     # Hardcoded meal plan to avoid complexity
     meal_plan_response = MealPlan(
         daily_calories=1800,
+        protein_grams=135,
+        carbs_grams=180,
+        fat_grams=60,
         meal_suggestions=[
             "Breakfast: Greek yogurt with berries and a sprinkle of nuts",
             "Lunch: Grilled chicken salad with mixed greens and olive oil dressing",
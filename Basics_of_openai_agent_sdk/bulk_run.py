@@ -0,0 +1,245 @@
+###########################################################################
+# Bulk runner for the step agents
+###########################################################################
+# Runs every query of a JSONL file through one of the step agents,
+# concurrently, and streams one JSONL result per query with latency,
+# turn and token stats.
+#
+#   python bulk_run.py queries.jsonl --agent tools --out results.jsonl --concurrency 16
+#
+# Input lines look like {"id": "q1", "query": "..."}. "id" defaults to the
+# line number. For the guarded coach a line may also carry
+# "context": {...} to override fields of the default UserContext.
+#
+# Only finished queries (ok or stopped by the guardrail) go to --out, and
+# their ids are appended to a checkpoint file (<out>.done by default).
+# Re-running the same command skips them, so an interrupted run resumes
+# where it stopped. Failed queries go to an errors file (<out>.errors by
+# default, rewritten on every run) and are retried on the next run. On
+# resume the output is compacted to one row per id, which also drops a
+# row cut short by a crash.
+###########################################################################
+
+import argparse
+import asyncio
+import importlib
+import json
+import statistics
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from agents import InputGuardrailTripwireTriggered, RunConfig, Runner
+
+# agent choice -> (step script, agent attribute)
+AGENTS = {
+    "basic": ("agent_step1", "fitness_agent"),
+    "tools": ("agent_step2", "fitness_agent"),
+    "handoff": ("agent_step3", "fitness_agent"),
+    "guarded": ("agent_step4", "fitness_agent"),
+}
+
+# UserContext used by the guarded coach (same as the agent_step4 demo)
+DEFAULT_CONTEXT = {
+    "user_id": "bulk",
+    "fitness_level": "beginner",
+    "fitness_goal": "weight loss",
+    "dietary_preference": "no restrictions",
+    "available_equipment": ["dumbbells", "resistance bands"],
+}
+
+
+###########################################################################
+# --- Input, checkpoint and output ---
+###########################################################################
+
+def read_queries(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if isinstance(row, str):
+                row = {"query": row}
+            row.setdefault("id", str(number))
+            row["id"] = str(row["id"])
+            yield row
+
+
+def read_checkpoint(path):
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def compact_output(path):
+    """Keep the last finished row per id in the results file; return the ids it holds"""
+    if not path.exists():
+        return set()
+    rows = {}
+    lines = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            lines += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line of an interrupted run
+            if row.get("status") == "error":
+                continue  # left by older runs, which wrote failures here too
+            rows.pop(row["id"], None)  # re-insert so the row keeps its latest position
+            rows[row["id"]] = row
+    if len(rows) != lines:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in rows.values():
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        tmp_path.replace(path)
+        print(f"Compacted {path}: {lines} lines -> {len(rows)} rows", file=sys.stderr)
+    return set(rows)
+
+
+def to_json(value):
+    return value.model_dump(mode="json") if hasattr(value, "model_dump") else value
+
+
+###########################################################################
+# --- Running one query ---
+###########################################################################
+
+async def run_query(agent, row, context_type, run_config, max_turns, timeout):
+    """Run one query and return its result row"""
+    record = {"id": row["id"], "query": row["query"]}
+    context = None
+    if context_type is not None:
+        context = context_type(**{**DEFAULT_CONTEXT, **row.get("context", {})})
+        record["context"] = asdict(context)
+
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(
+            Runner.run(agent, row["query"], context=context, max_turns=max_turns, run_config=run_config),
+            timeout,
+        )
+    except InputGuardrailTripwireTriggered as e:
+        record.update(status="guardrail", output=to_json(e.guardrail_result.output.output_info))
+    except asyncio.TimeoutError:
+        record.update(status="error", error=f"timed out after {timeout}s")
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {str(e)}")
+    else:
+        usage = result.context_wrapper.usage
+        record.update(
+            status="ok",
+            output=to_json(result.final_output),
+            last_agent=result.last_agent.name,
+            turns=len(result.raw_responses),
+            tool_calls=sum(1 for item in result.new_items if item.type == "tool_call_item"),
+            handoffs=sum(1 for item in result.new_items if item.type == "handoff_output_item"),
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+        )
+    record["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+
+###########################################################################
+# --- Bulk run ---
+###########################################################################
+
+async def bulk_run(args):
+    module = importlib.import_module(AGENTS[args.agent][0])
+    agent = getattr(module, AGENTS[args.agent][1])
+    context_type = module.UserContext if args.agent == "guarded" else None
+    run_config = RunConfig(tracing_disabled=not args.trace)
+
+    out_path = Path(args.out)
+    checkpoint_path = Path(args.checkpoint or f"{args.out}.done")
+    errors_path = Path(args.errors or f"{args.out}.errors")
+    if args.fresh:
+        out_path.unlink(missing_ok=True)
+        checkpoint_path.unlink(missing_ok=True)
+    # a row written just before a crash may be missing from the checkpoint, so the results count too
+    done = read_checkpoint(checkpoint_path) | compact_output(out_path)
+    rows = [row for row in read_queries(args.queries) if row["id"] not in done]
+    if args.limit is not None:
+        rows = rows[:args.limit]
+    print(f"{len(rows)} queries to run with the {args.agent} coach ({len(done)} already done), "
+          f"concurrency {args.concurrency}", file=sys.stderr)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    records = []
+    start = time.perf_counter()
+
+    with open(out_path, "a", encoding="utf-8") as out, open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            open(errors_path, "w", encoding="utf-8") as errors:
+        async def run_one(row):
+            async with semaphore:
+                record = await run_query(agent, row, context_type, run_config, args.max_turns, args.timeout)
+            # single event loop thread: each record is written and flushed as a whole line
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            if record["status"] == "error":
+                errors.write(line)
+                errors.flush()
+            else:
+                out.write(line)
+                out.flush()
+                checkpoint.write(record["id"] + "\n")
+                checkpoint.flush()
+            records.append(record)
+            if len(records) % args.progress_every == 0:
+                print(f"  {len(records)}/{len(rows)} done", file=sys.stderr)
+
+        await asyncio.gather(*(run_one(row) for row in rows))
+
+    print_summary(records, time.perf_counter() - start)
+    failed = sum(1 for r in records if r["status"] == "error")
+    if failed:
+        print(f"{failed} failed queries written to {errors_path}; run the same command again to retry them",
+              file=sys.stderr)
+
+
+def print_summary(records, elapsed):
+    if not records:
+        print("Nothing to run", file=sys.stderr)
+        return
+    statuses = {status: sum(1 for r in records if r["status"] == status) for status in ("ok", "guardrail", "error")}
+    latencies = sorted(r["latency_ms"] for r in records)
+    ok = [r for r in records if r["status"] == "ok"]
+    print(f"\n{len(records)} queries in {elapsed:.1f}s ({len(records) / elapsed:.1f}/s): "
+          + ", ".join(f"{count} {status}" for status, count in statuses.items()), file=sys.stderr)
+    print(f"Latency ms: p50 {statistics.median(latencies):.0f}, "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.0f}, max {latencies[-1]:.0f}", file=sys.stderr)
+    if ok:
+        print(f"Mean turns: {statistics.mean(r['turns'] for r in ok):.2f}, "
+              f"tokens: {sum(r['input_tokens'] for r in ok)} in / {sum(r['output_tokens'] for r in ok)} out",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through one of the step agents")
+    parser.add_argument("queries", help="JSONL file with one {\"id\", \"query\"} object per line")
+    parser.add_argument("--agent", choices=list(AGENTS), default="tools",
+                        help="basic (step1), tools (step2), handoff (step3) or guarded (step4, with UserContext)")
+    parser.add_argument("--out", default="results.jsonl", help="Result JSONL file (appended to)")
+    parser.add_argument("--checkpoint", help="File of finished query ids (default: <out>.done)")
+    parser.add_argument("--errors", help="File for the failed queries of this run (default: <out>.errors)")
+    parser.add_argument("--fresh", action="store_true", help="Delete the output and checkpoint and start over")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries running at the same time")
+    parser.add_argument("--max-turns", type=int, default=10, help="max_turns for each Runner.run")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a query is abandoned")
+    parser.add_argument("--limit", type=int, default=None, help="Run at most this many pending queries")
+    parser.add_argument("--trace", action="store_true", help="Keep OpenAI tracing enabled for the runs")
+    parser.add_argument("--progress-every", type=int, default=50, help="Print progress every N queries")
+    args = parser.parse_args()
+    try:
+        asyncio.run(bulk_run(args))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,31 @@
 import asyncio
-import json
+import hashlib
 import os
 import logging
-from fastapi import FastAPI, HTTPException
+import secrets
+import time
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from agents import Agent, Runner, function_tool
-from typing import List
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, ValidationError
+from agents import (Agent, AgentsException, InputGuardrail, InputGuardrailTripwireTriggered, MaxTurnsExceeded,
+                    ModelBehaviorError, RunConfig, Runner)
+from typing import Literal, Optional
 from dotenv import load_dotenv
 
+import fitness_core
+from fitness_core.calculations import calorie_targets
+from fitness_core.encoding import compact_json
+from fitness_core.models import MealPlan, WorkoutPlan
+from trace_store import RunTimer, TraceRecorder
+from plan_library import PlanLibrary
+from model_router import STRONG, ModelRouter
+from http_cache import FastJSONResponse, cached_response
+from state_store import StateStore, pack, pack_model, unpack, unpack_model
+from jobs import JobQueue, JobStore, QueueFull, public_job, validate_callback_url
+from usage import QuotaExceeded, UsageHooks, UsageMeter, current_account, parse_quotas
+from guardrails import FAIL_OPEN, GuardrailUnavailable, OptimisticGuardrails, parse_timeouts
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -19,8 +36,66 @@ load_dotenv()
 # Set model choice
 model = os.getenv('LLM_MODEL_NAME', 'gpt-4o-mini')
 
+# Optional on-disk run traces for replay and analysis
+trace_dir = os.getenv('TRACE_DIR')
+trace_recorder = TraceRecorder(
+    trace_dir,
+    max_segments=int(os.getenv('TRACE_MAX_SEGMENTS', '16')),
+    max_age=float(os.getenv('TRACE_MAX_AGE_DAYS', '7')) * 86400,
+) if trace_dir else None
+
+# Precomputed plans for the common workout/nutrition request grid
+plan_library = PlanLibrary(os.getenv('PLAN_LIBRARY', 'plans.db')).load()
+
+# HTTP caching: plans are cacheable by any cache, general answers only by the client
+plan_cache_control = f"public, max-age={int(os.getenv('PLAN_CACHE_MAX_AGE', '86400'))}"
+general_cache_control = f"private, max-age={int(os.getenv('GENERAL_CACHE_MAX_AGE', '300'))}"
+
+# Agent response cache, single-flight locks and rate counters; shared between replicas when REDIS_URL is set
+state = StateStore(os.getenv('REDIS_URL'))
+response_cache_ttl = float(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+rate_limit_per_minute = int(os.getenv('RATE_LIMIT_PER_MINUTE', '60'))
+
+# API keys that get their own rate limit and quota (API_KEYS=key1,key2); stored as hashes
+api_key_hashes = {hashlib.sha256(key.strip().encode()).hexdigest() for key in os.getenv('API_KEYS', '').split(",") if key.strip()}
+
+# Token and request quotas per client, counted in memory and flushed to USAGE_DB
+usage_meter = UsageMeter(
+    os.getenv('USAGE_DB', 'usage.db'),
+    window_seconds=float(os.getenv('USAGE_WINDOW_SECONDS', '3600')),
+    token_quota=int(os.getenv('USAGE_TOKEN_QUOTA', '0')),
+    request_quota=int(os.getenv('USAGE_REQUEST_QUOTA', '0')),
+    endpoint_token_quotas=parse_quotas(os.getenv('USAGE_ENDPOINT_TOKEN_QUOTAS', '')),
+    flush_interval=float(os.getenv('USAGE_FLUSH_SECONDS', '10')),
+)
+
+# Key required by the /admin endpoints; they are disabled when unset
+admin_api_key = os.getenv('ADMIN_API_KEY')
+
 # Initialize FastAPI app
-app = FastAPI(title="Fitness Coach API")
+app = FastAPI(title="Fitness Coach API", default_response_class=FastJSONResponse)
+
+@app.on_event("startup")
+async def start_trace_recorder():
+    if trace_recorder is not None:
+        trace_recorder.start()
+
+@app.on_event("shutdown")
+async def stop_trace_recorder():
+    if trace_recorder is not None:
+        trace_recorder.close()
+
+@app.on_event("shutdown")
+async def close_state():
+    await state.close()
+
+@app.on_event("startup")
+async def start_usage_meter():
+    usage_meter.start()
+
+@app.on_event("shutdown")
+async def stop_usage_meter():
+    await usage_meter.stop()
 
 # Add CORS middleware to allow frontend communication
 app.add_middleware(
@@ -29,24 +104,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# --- Structured Output Models ---
-class WorkoutPlan(BaseModel):
-    """Workout recommendation with exercises and details"""
-    focus_area: str = Field(description="Primary focus of the workout (e.g., 'upper body', 'cardio')")
-    difficulty: str = Field(description="Difficulty level (Beginner, Intermediate, Advanced)")
-    exercises: List[str] = Field(description="List of recommended exercises")
-    notes: str = Field(description="Additional notes or form tips")
-
-class MealPlan(BaseModel):
-    """Basic meal plan recommendation"""
-    daily_calories: int = Field(description="Recommended daily calorie intake")
-    protein_grams: int = Field(description="Daily protein target in grams")
-    carbs_grams: int = Field(description="Daily carbohydrate target in grams") 
-    fat_grams: int = Field(description="Daily fat target in grams")
-    meal_suggestions: List[str] = Field(description="Simple meal ideas")
-    notes: str = Field(description="Dietary advice and tips")
+# Compress responses above a size threshold, with brotli when brotli-asgi is installed
+compress_min_size = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=compress_min_size, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=compress_min_size)
 
 # --- Request Models ---
 class GeneralQueryRequest(BaseModel):
@@ -63,189 +130,312 @@ class NutritionQueryRequest(BaseModel):
     age: int = Field(description="Age in years")
     gender: str = Field(description="Gender (male, female)")
 
-# --- Tools ---
-@function_tool
-def get_exercise_info(muscle_group: str) -> str:
-    """Get a list of exercises for a specific muscle group"""
-    logger.debug(f"Calling get_exercise_info with muscle_group: {muscle_group}")
-    exercise_data = {
-        "chest": [
-            "Push-ups: 3 sets of 10-15 reps",
-            "Bench Press: 3 sets of 8-12 reps",
-            "Chest Flyes: 3 sets of 12-15 reps",
-            "Incline Push-ups: 3 sets of 10-15 reps"
-        ],
-        "back": [
-            "Pull-ups: 3 sets of 6-10 reps",
-            "Bent-over Rows: 3 sets of 8-12 reps",
-            "Lat Pulldowns: 3 sets of 10-12 reps",
-            "Superman Holds: 3 sets of 30 seconds"
-        ],
-        "legs": [
-            "Squats: 3 sets of 10-15 reps",
-            "Lunges: 3 sets of 10 per leg",
-            "Calf Raises: 3 sets of 15-20 reps",
-            "Glute Bridges: 3 sets of 15 reps"
-        ],
-        "arms": [
-            "Bicep Curls: 3 sets of 10-12 reps",
-            "Tricep Dips: 3 sets of 10-15 reps",
-            "Hammer Curls: 3 sets of 10-12 reps",
-            "Overhead Tricep Extensions: 3 sets of 10-12 reps"
-        ],
-        "core": [
-            "Planks: 3 sets of 30-60 seconds",
-            "Crunches: 3 sets of 15-20 reps",
-            "Russian Twists: 3 sets of 20 total reps",
-            "Mountain Climbers: 3 sets of 20 total reps"
-        ]
-    }
-    
-    muscle_group = muscle_group.lower()
-    if muscle_group in exercise_data:
-        exercises = exercise_data[muscle_group]
-        result = {
-            "muscle_group": muscle_group,
-            "exercises": exercises,
-            "recommendation": f"For {muscle_group} training, complete all exercises with 60-90 seconds rest between sets."
-        }
-        logger.debug(f"get_exercise_info result: {result}")
-        return json.dumps(result)
-    else:
-        logger.warning(f"Muscle group {muscle_group} not found")
-        return f"Exercise information for {muscle_group} is not available."
-
-@function_tool
-def calculate_calories(goal: str, weight_kg: float, height_cm: float, age: int, gender: str) -> str:
-    """Calculate daily calorie needs and macronutrient breakdown based on user stats and goals"""
-    logger.debug(f"Calling calculate_calories with goal: {goal}, weight_kg: {weight_kg}, height_cm: {height_cm}, age: {age}, gender: {gender}")
-    
-    # Calculate BMR (Basal Metabolic Rate) using Mifflin-St Jeor Equation
-    if gender.lower() in ['male', 'm']:
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
-    else:  # female
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
-    
-    # Use a moderate activity level
-    tdee = bmr * 1.55
-    
-    # Adjust based on goal
-    if goal.lower() == "weight loss":
-        calorie_target = tdee - 500
-    elif goal.lower() == "muscle gain":
-        calorie_target = tdee + 300
-    else:
-        calorie_target = tdee
-    
-    # Calculate macros
-    if goal.lower() == "weight loss":
-        protein_pct, fat_pct, carb_pct = 0.40, 0.30, 0.30
-    elif goal.lower() == "muscle gain":
-        protein_pct, fat_pct, carb_pct = 0.30, 0.25, 0.45
-    else:
-        protein_pct, fat_pct, carb_pct = 0.30, 0.30, 0.40
-    
-    protein_calories = calorie_target * protein_pct
-    fat_calories = calorie_target * fat_pct
-    carb_calories = calorie_target * carb_pct
-    
-    protein_grams = round(protein_calories / 4)
-    fat_grams = round(fat_calories / 9)
-    carb_grams = round(carb_calories / 4)
-    
-    result = {
-        "goal": goal,
-        "daily_calories": round(calorie_target),
-        "macros": {
-            "protein": protein_grams,
-            "fat": fat_grams,
-            "carbs": carb_grams
-        }
-    }
-    
-    logger.debug(f"calculate_calories result: {result}")
-    return json.dumps(result)
-
-# --- Specialized Agents ---
-workout_agent = Agent(
-    name="Workout Specialist",
-    handoff_description="Specialist agent for creating workout plans",
-    instructions="""
-    You are a workout specialist who creates effective exercise routines.
-    Use the get_exercise_info tool to find exercises for specific muscle groups.
-    Create a WorkoutPlan that matches the user's fitness level and goals.
-    For weight loss, include a mix of cardio and strength exercises.
-    Always include form tips in the notes to prevent injury.
-    Ensure the output strictly follows the WorkoutPlan schema.
-    """,
-    model=model,
-    tools=[get_exercise_info],
-    output_type=WorkoutPlan
-)
+class JobRequest(BaseModel):
+    kind: Literal["general", "workout", "nutrition"] = Field(description="Which /fitness endpoint the job runs")
+    request: dict = Field(description="Body of the corresponding /fitness/<kind> request")
+    priority: Literal["high", "normal", "low"] = Field(default="normal", description="Queue lane")
+    callback_url: Optional[str] = Field(default=None, description="URL that receives the finished job as a JSON POST")
 
-nutrition_agent = Agent(
-    name="Nutrition Specialist",
-    handoff_description="Specialist agent for nutrition advice and meal planning",
-    instructions="""
-    You are a nutrition specialist who helps users with meal planning and nutrition advice.
-    Use the calculate_calories tool to determine appropriate calorie and macronutrient targets.
-    Provide a MealPlan with meal suggestions that support the user's fitness goals.
-    Focus on practical, sustainable nutrition advice.
-    Ensure the output strictly follows the MealPlan schema.
-    """,
-    model=model,
-    tools=[calculate_calories],
-    output_type=MealPlan
-)
+# --- Agents ---
+# Built on first access from the shared package, after load_dotenv so LLM_MODEL_NAME is honoured
+workout_agent = fitness_core.workout_agent
+nutrition_agent = fitness_core.nutrition_agent
+fitness_agent = fitness_core.fitness_agent
+
+# --- Model Tiering ---
+model_router = ModelRouter.from_env(model)
+model_router.assign({"fitness": fitness_agent, "workout": workout_agent, "nutrition": nutrition_agent})
 
-# --- Main Fitness Agent ---
-fitness_agent = Agent(
-    name="Fitness Coach with Specialized Agents",
-    instructions="""
-    You are a fitness coach who helps users achieve their health and fitness goals.
-    For queries about workouts or exercises, immediately hand off to the Workout Specialist.
-    For queries about nutrition, diet, or meal plans, immediately hand off to the Nutrition Specialist.
-    For general fitness questions, provide brief, practical advice without using tools or handoffs.
-    Do not attempt to answer specialized workout or nutrition questions yourself.
-    """,
-    model=model,
-    tools=[get_exercise_info, calculate_calories],
-    handoffs=[workout_agent, nutrition_agent]
+# --- Guardrails ---
+# Checked concurrently with the agent run; the run is cancelled as soon as a guardrail trips
+guardrails_enabled = os.getenv('GUARDRAILS', '0').lower() in ('1', 'true', 'yes')
+guarded_endpoints = {name.strip() for name in os.getenv('GUARDRAIL_ENDPOINTS', 'general').split(",") if name.strip()}
+
+async def fitness_goal_guardrail(ctx, agent: Agent, query: str):
+    """fitness_core's goal check, with its model calls charged to the current account"""
+    account = current_account.get()
+    hooks = UsageHooks(usage_meter, account, "guardrail") if account is not None else None
+    return await fitness_core.analyze_fitness_goal(query, hooks)
+
+input_guardrails = OptimisticGuardrails(
+    [InputGuardrail(guardrail_function=fitness_goal_guardrail, name="fitness_goal")],
+    timeout=float(os.getenv('GUARDRAIL_TIMEOUT', '10')),
+    timeouts=parse_timeouts(os.getenv('GUARDRAIL_TIMEOUTS', '')),
+    policy=os.getenv('GUARDRAIL_POLICY', FAIL_OPEN).lower(),
 )
 
-# --- API Endpoints ---
-@app.post("/fitness/general", response_model=dict)
-async def general_fitness_query(request: GeneralQueryRequest):
+# --- Agent Runner ---
+async def run_once(endpoint: str, agent: Agent, query: str, run_config: Optional[RunConfig] = None,
+                   hooks: Optional[UsageHooks] = None):
+    """One Runner.run, handed to the trace recorder whether it finishes, fails or is cancelled"""
+    start = time.perf_counter()
+    run, status, error = None, "ok", None
+    timer = RunTimer(hooks) if trace_recorder is not None else None
     try:
-        logger.info(f"Processing general fitness query: {request.query}")
-        result = await Runner.run(fitness_agent, request.query, max_turns=20)
-        return {"response": result.final_output}
+        run = await Runner.run(agent, query, max_turns=20, run_config=run_config, hooks=timer or hooks)
+        return run
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except AgentsException as e:
+        # run_data holds the items and model responses up to the failure
+        run, error = e.run_data, str(e)
+        status = "max_turns" if isinstance(e, MaxTurnsExceeded) else "error"
+        raise
     except Exception as e:
-        logger.error(f"Error processing general query: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        status, error = "error", str(e)
+        raise
+    finally:
+        if trace_recorder is not None:
+            trace_recorder.record(endpoint, agent.name, query, run, time.perf_counter() - start, status, error,
+                                  timer.timings())
 
-@app.post("/fitness/workout", response_model=WorkoutPlan)
-async def workout_query(request: WorkoutQueryRequest):
+async def run_agent(endpoint: str, agent: Agent, query: str):
+    """Run an agent and charge its token usage to the current account"""
+    account = current_account.get()
+    usage_meter.begin(account, endpoint)  # raises QuotaExceeded before any model call
+    # tokens are charged per model response, including those of failed, cancelled and retried runs
+    hooks = UsageHooks(usage_meter, account, endpoint) if account is not None else None
     try:
-        query = f"Create a workout plan for {request.muscle_group} at {request.level} level"
+        result = await run_once(endpoint, agent, query, hooks=hooks)
+    except ModelBehaviorError as e:
+        if not model_router.enabled:
+            raise
+        # Output failed validation on a routed (possibly fast) tier: redo the whole run on the strong model
+        logger.warning(f"Retrying {endpoint} query on {model_router.strong_model} after invalid output: {str(e)}")
+        result = await run_once(endpoint, agent, query, RunConfig(model=model_router.model(STRONG)), hooks)
+    return result
+
+def workout_prompt(request: WorkoutQueryRequest) -> str:
+    return f"Create a workout plan for {request.muscle_group} at {request.level} level"
+
+def nutrition_prompt(request: NutritionQueryRequest) -> str:
+    return f"Create a meal plan for {request.goal} with weight {request.weight_kg}kg, height {request.height_cm}cm, age {request.age}, gender {request.gender}"
+
+def guarded_run(endpoint: str, agent: Agent, query: str):
+    """run_agent, checked by the input guardrails when they are enabled for `endpoint`"""
+    if guardrails_enabled and endpoint in guarded_endpoints:
+        return input_guardrails.run(agent, query, lambda: run_agent(endpoint, agent, query))
+    return run_agent(endpoint, agent, query)
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the agent run finished"""
+
+# How often a running request checks whether its client is still connected
+disconnect_poll_seconds = float(os.getenv('DISCONNECT_POLL_SECONDS', '0.5'))
+
+async def run_agent_for_client(http_request: Optional[Request], endpoint: str, agent: Agent, query: str):
+    """guarded_run, cancelled as soon as the client disconnects (e.g. the frontend aborts a superseded request).
+    Background jobs pass no request and always run to completion."""
+    if http_request is None:
+        return await guarded_run(endpoint, agent, query)
+    task = asyncio.create_task(guarded_run(endpoint, agent, query))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=disconnect_poll_seconds)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+# --- Response Cache and Rate Limits ---
+def client_id(http_request: Request) -> str:
+    """Configured API key when the client sends one, otherwise its address.
+    Unknown keys are ignored, so rotating made-up keys does not reset a client's limits."""
+    key = http_request.headers.get("x-api-key")
+    if key:
+        key_hash = hashlib.sha256(key.encode()).hexdigest()
+        if key_hash in api_key_hashes:
+            return "key:" + key_hash[:16]
+    return "ip:" + (http_request.client.host if http_request.client else "unknown")
+
+async def check_rate_limit(http_request: Request):
+    if rate_limit_per_minute <= 0:
+        return
+    now = time.time()
+    count = await state.incr(f"rate:{client_id(http_request)}:{int(now // 60)}", 60)
+    if count > rate_limit_per_minute:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded",
+                            headers={"Retry-After": str(60 - int(now) % 60)})
+
+async def cached_agent_output(kind: str, request: BaseModel, produce, output_type=None):
+    """Return the cached output for `request`, or produce it once across all tasks and replicas"""
+    fields = list(output_type.model_fields) if output_type else []
+    raw = compact_json([kind, fields, request.model_dump(mode="json")])
+    key = f"response:{kind}:{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"
+    decode = (lambda data: unpack_model(output_type, data)) if output_type else unpack
+    encode = pack_model if output_type else pack
+
+    data = await state.get(key)
+    if data is not None:
+        return decode(data)
+    async with state.single_flight(key):
+        data = await state.get(key)
+        if data is not None:
+            return decode(data)
+        output = await produce()
+        await state.set(key, encode(output), response_cache_ttl)
+        return output
+
+# --- Plan Services ---
+async def general_answer(request: GeneralQueryRequest, http_request: Optional[Request]) -> dict:
+    async def produce():
+        logger.info(f"Processing general fitness query: {request.query}")
+        result = await run_agent_for_client(http_request, "general", fitness_agent, request.query)
+        return {"response": result.final_output}
+    return await cached_agent_output("general", request, produce)
+
+async def workout_plan_for(request: WorkoutQueryRequest, http_request: Optional[Request]) -> WorkoutPlan:
+    plan = plan_library.workout_plan(request.muscle_group, request.level)
+    if plan is not None:
+        logger.info(f"Serving workout plan for {request.muscle_group}/{request.level} from library")
+        return WorkoutPlan(**plan)
+    async def produce():
+        query = workout_prompt(request)
         logger.info(f"Processing workout query: {query}")
-        result = await Runner.run(workout_agent, query, max_turns=20)
+        result = await run_agent_for_client(http_request, "workout", workout_agent, query)
         return result.final_output
-    except Exception as e:
-        logger.error(f"Error processing workout query: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await cached_agent_output("workout", request, produce, WorkoutPlan)
 
-@app.post("/fitness/nutrition", response_model=MealPlan)
-async def nutrition_query(request: NutritionQueryRequest):
-    try:
-        query = f"Create a meal plan for {request.goal} with weight {request.weight_kg}kg, height {request.height_cm}cm, age {request.age}, gender {request.gender}"
+async def meal_plan_for(request: NutritionQueryRequest, http_request: Optional[Request]) -> MealPlan:
+    targets = calorie_targets(request.goal, request.weight_kg, request.height_cm, request.age, request.gender)
+    plan = plan_library.meal_plan(request.goal, request.weight_kg, request.height_cm, request.age, request.gender, targets)
+    if plan is not None:
+        logger.info(f"Serving meal plan for {request.goal}/{request.gender} from library")
+        return MealPlan(**plan)
+    async def produce():
+        query = nutrition_prompt(request)
         logger.info(f"Processing nutrition query: {query}")
-        result = await Runner.run(nutrition_agent, query, max_turns=20)
+        result = await run_agent_for_client(http_request, "nutrition", nutrition_agent, query)
         return result.final_output
+    return await cached_agent_output("nutrition", request, produce, MealPlan)
+
+def quota_exceeded(e: QuotaExceeded) -> HTTPException:
+    logger.info(f"Rejected request from {e.account}: {str(e)}")
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def serve(kind: str, service, request: BaseModel, http_request: Request, cache_control: str):
+    """Run a plan service and wrap the result in a cacheable response"""
+    await check_rate_limit(http_request)
+    current_account.set(client_id(http_request))
+    try:
+        return cached_response(http_request, await service(request, http_request), cache_control)
+    except QuotaExceeded as e:
+        raise quota_exceeded(e)
+    except InputGuardrailTripwireTriggered as e:
+        output = e.guardrail_result.output.output_info
+        logger.info(f"Guardrail blocked {kind} query: {output}")
+        raise HTTPException(status_code=400, detail=getattr(output, "reasoning", "Request blocked by a guardrail"))
+    except GuardrailUnavailable as e:
+        logger.error(f"Blocked {kind} query: {str(e)}")
+        raise HTTPException(status_code=503, detail="Request could not be checked, try again later")
+    except ClientDisconnected:
+        logger.info(f"Client disconnected, cancelled {kind} query")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
-        logger.error(f"Error processing nutrition query: {str(e)}")
+        logger.error(f"Error processing {kind} query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Background Jobs ---
+job_services = {
+    "general": (GeneralQueryRequest, general_answer),
+    "workout": (WorkoutQueryRequest, workout_plan_for),
+    "nutrition": (NutritionQueryRequest, meal_plan_for),
+}
+
+def job_handler(kind: str):
+    request_type, service = job_services[kind]
+    async def handle(payload: dict, account: Optional[str]):
+        current_account.set(account)
+        output = await service(request_type(**payload), None)
+        return output.model_dump(mode="json") if isinstance(output, BaseModel) else output
+    return handle
+
+job_queue = JobQueue(
+    JobStore(os.getenv('JOBS_DB', 'jobs.db')),
+    {kind: job_handler(kind) for kind in job_services},
+    workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_pending=int(os.getenv('JOB_QUEUE_SIZE', '1000')),
+    lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', '60')),
+    allow_private_callbacks=os.getenv('JOB_PRIVATE_CALLBACKS', '0') == '1',
+)
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+# --- API Endpoints ---
+@app.post("/fitness/general", response_model=dict)
+async def general_fitness_query(request: GeneralQueryRequest, http_request: Request):
+    return await serve("general", general_answer, request, http_request, general_cache_control)
+
+@app.post("/fitness/workout", response_model=WorkoutPlan)
+async def workout_query(request: WorkoutQueryRequest, http_request: Request):
+    return await serve("workout", workout_plan_for, request, http_request, plan_cache_control)
+
+@app.post("/fitness/nutrition", response_model=MealPlan)
+async def nutrition_query(request: NutritionQueryRequest, http_request: Request):
+    return await serve("nutrition", meal_plan_for, request, http_request, plan_cache_control)
+
+@app.post("/fitness/jobs", status_code=202)
+async def submit_job(job: JobRequest, http_request: Request):
+    await check_rate_limit(http_request)
+    account = client_id(http_request)
+    try:
+        usage_meter.check(account, job.kind)
+    except QuotaExceeded as e:
+        raise quota_exceeded(e)
+    request_type, _ = job_services[job.kind]
+    try:
+        payload = request_type(**job.request).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    if job.callback_url:
+        try:
+            await asyncio.to_thread(validate_callback_url, job.callback_url, job_queue.allow_private_callbacks)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    try:
+        created = await job_queue.submit(job.kind, payload, job.priority, job.callback_url, account)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full", headers={"Retry-After": "30"})
+    return {"job_id": created["id"], "status": created["status"]}
+
+@app.get("/fitness/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Job status and result; `wait` long-polls up to 60 seconds for the job to finish"""
+    job = await job_queue.wait(job_id, min(max(wait, 0), 60))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
+@app.get("/admin/usage")
+async def usage_report(http_request: Request, hours: float = 24, account: Optional[str] = None, limit: int = 50):
+    """Token and request usage per client and endpoint over the last `hours`, heaviest clients first"""
+    supplied = http_request.headers.get("x-admin-key", "")
+    if not admin_api_key or not secrets.compare_digest(supplied.encode(), admin_api_key.encode()):
+        raise HTTPException(status_code=403, detail="Admin access denied")
+    return usage_meter.report(time.time() - hours * 3600, account, max(1, min(limit, 1000)))
+
+# GET variants of the plan endpoints so a reverse proxy or CDN can cache them by URL
+@app.get("/fitness/workout", response_model=WorkoutPlan)
+async def workout_query_get(http_request: Request, muscle_group: str, level: str):
+    request = WorkoutQueryRequest(muscle_group=muscle_group, level=level)
+    return await serve("workout", workout_plan_for, request, http_request, plan_cache_control)
+
+@app.get("/fitness/nutrition", response_model=MealPlan)
+async def nutrition_query_get(http_request: Request, goal: str, weight_kg: float, height_cm: float, age: int, gender: str):
+    request = NutritionQueryRequest(goal=goal, weight_kg=weight_kg, height_cm=height_cm, age=age, gender=gender)
+    return await serve("nutrition", meal_plan_for, request, http_request, plan_cache_control)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
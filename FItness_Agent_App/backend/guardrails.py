@@ -0,0 +1,104 @@
+"""Optimistic input guardrails.
+
+`OptimisticGuardrails.run` starts the agent run and every guardrail check at
+the same time. The agent's output is held back until all checks have passed.
+The first tripwire cancels the agent run (and the remaining checks) straight
+away, so a blocked request stops spending tokens. A guarded request takes
+about max(guardrails, agent) instead of their sum.
+
+The Agents SDK's own input guardrails only overlap the first model turn. Here
+they cover the whole multi-turn run, and each check has its own timeout. A
+check that fails or times out is skipped under the fail-open policy, or
+blocks the request under fail-closed.
+
+Configuration (environment, read by app.py):
+    GUARDRAILS=1                     enable guardrails (off by default)
+    GUARDRAIL_ENDPOINTS=general      endpoints whose queries are checked
+    GUARDRAIL_TIMEOUT=10             default seconds per guardrail check
+    GUARDRAIL_TIMEOUTS=fitness_goal=5
+                                     per-guardrail overrides, by guardrail name
+    GUARDRAIL_POLICY=open            open: skip failed checks, closed: block the request
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from agents import Agent, InputGuardrail, InputGuardrailTripwireTriggered, RunContextWrapper
+from agents.guardrail import InputGuardrailResult
+
+logger = logging.getLogger(__name__)
+
+FAIL_OPEN = "open"
+FAIL_CLOSED = "closed"
+
+
+class GuardrailUnavailable(Exception):
+    """A guardrail check failed or timed out under the fail-closed policy"""
+
+
+def parse_timeouts(text: str) -> Dict[str, float]:
+    """Parse `guardrail=seconds,...` into a dict"""
+    timeouts = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        name, _, seconds = entry.partition("=")
+        timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+class OptimisticGuardrails:
+    """Runs input guardrails concurrently with the agent run they protect"""
+
+    def __init__(self, guardrails: List[InputGuardrail], timeout: float = 10.0,
+                 timeouts: Optional[Dict[str, float]] = None, policy: str = FAIL_OPEN):
+        if policy not in (FAIL_OPEN, FAIL_CLOSED):
+            raise ValueError(f"Unknown guardrail policy '{policy}', expected '{FAIL_OPEN}' or '{FAIL_CLOSED}'")
+        self.guardrails = guardrails
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.policy = policy
+
+    async def _check(self, guardrail: InputGuardrail, agent: Agent, query: str) -> Optional[InputGuardrailResult]:
+        """Result of one guardrail, or None when it failed under the fail-open policy"""
+        name = guardrail.get_name()
+        timeout = self.timeouts.get(name, self.timeout)
+        try:
+            return await asyncio.wait_for(guardrail.run(agent, query, RunContextWrapper(context=None)), timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout:g}s"
+        except Exception as e:
+            error = str(e)
+        if self.policy == FAIL_CLOSED:
+            raise GuardrailUnavailable(f"Guardrail {name} {error}")
+        logger.warning(f"Guardrail {name} {error}; letting the request through (fail-open)")
+        return None
+
+    async def run(self, agent: Agent, query: str, main: Callable[[], Awaitable]):
+        """Await `main()` while checking `query`, and return its result once every check passed.
+
+        Raises InputGuardrailTripwireTriggered on the first tripwire and
+        GuardrailUnavailable when a check fails under the fail-closed policy;
+        the agent run is cancelled in both cases.
+        """
+        main_task = asyncio.create_task(main())
+        checks = {asyncio.create_task(self._check(guardrail, agent, query)) for guardrail in self.guardrails}
+        pending = set(checks)
+        try:
+            while pending:
+                waiting = pending if main_task.done() else pending | {main_task}
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if main_task in done and main_task.exception() is not None:
+                    # the run failed on its own; the remaining checks no longer matter
+                    return main_task.result()
+                for check in done & pending:
+                    pending.discard(check)
+                    result = check.result()
+                    if result is not None and result.output.tripwire_triggered:
+                        logger.info(f"Guardrail {result.guardrail.get_name()} tripped, cancelling {agent.name} run")
+                        raise InputGuardrailTripwireTriggered(result)
+            return await main_task
+        finally:
+            for task in (main_task, *checks):
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,68 @@
+"""HTTP caching helpers: fast JSON encoding, content-hash ETags and conditional responses.
+
+Plans are deterministic functions of small request bodies, so responses carry
+an ETag (hash of the encoded body) and a Cache-Control header. The ETag is
+weak: the compression middleware sends the same tag with br, gzip and identity
+bodies, which a strong validator must not do. A GET or HEAD that revalidates
+with If-None-Match gets an empty 304 instead of the body; other methods get 412
+when the tag matches, as RFC 9110 requires. orjson is used for encoding when
+installed, the stdlib json otherwise.
+"""
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder when orjson is not installed
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` (pydantic models included) to compact JSON bytes"""
+    if isinstance(content, BaseModel):
+        content = content.model_dump(mode="json")
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def etag_for(body: bytes) -> str:
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header, as RFC 9110 prescribes for it"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _opaque_tag(etag)
+    return any(_opaque_tag(candidate.strip()) == opaque for candidate in if_none_match.split(","))
+
+
+def cached_response(request: Request, content: Any, cache_control: str) -> Response:
+    """JSON response with an ETag and Cache-Control, or a bodiless 304 (GET/HEAD) or
+    412 (other methods) when the client's If-None-Match already names this representation"""
+    body = dumps(content)
+    etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        if request.method in ("GET", "HEAD"):
+            return Response(status_code=304, headers=headers)
+        return Response(status_code=412, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers=headers)
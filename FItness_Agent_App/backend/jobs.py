@@ -0,0 +1,381 @@
+"""Asynchronous job queue for long-running plan generation.
+
+Jobs are persisted in SQLite so queued and interrupted jobs survive a restart,
+executed by a fixed pool of asyncio workers pulling from a bounded priority
+queue, and retrievable by id (optionally long-polling until they finish). An
+optional callback URL receives the finished job as a JSON POST.
+
+Several processes (e.g. `uvicorn --workers N`) can share one jobs database. A
+worker claims a job atomically and holds a lease on it that it renews while the
+job runs; other processes only pick the job up once the lease has expired,
+i.e. when its worker died. Store calls run in worker threads, so a write lock
+held by another process never blocks the event loop.
+"""
+import asyncio
+import functools
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """The job queue already holds its maximum number of pending jobs"""
+
+
+# --- Callback URL checks ---
+def validate_callback_url(url: str, allow_private: bool = False):
+    """Raise ValueError unless `url` is http(s) and every address its host resolves to is public.
+
+    Keeps callbacks from reaching loopback, link-local (cloud metadata), private
+    or otherwise reserved addresses on the server's network.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    if allow_private:
+        return
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                   type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host cannot be resolved: {str(e)}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url resolves to a non-public address ({address})")
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Redirects are not followed: the target would bypass validate_callback_url"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise urllib.error.HTTPError(req.full_url, code, f"redirect to {newurl} not followed", headers, fp)
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirects)
+
+
+def _serialized(method):
+    """Run a JobStore method under the store's lock: the connection is shared by several threads"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class JobStore:
+    """SQLite persistence for jobs. The database is opened by `open`, not on construction.
+
+    Calls block (up to `busy_timeout` seconds while another process holds the
+    write lock); JobQueue makes them from worker threads.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @_serialized
+    def open(self):
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.busy_timeout)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                callback_url TEXT,
+                account TEXT,
+                worker_id TEXT,
+                lease_until REAL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        # databases created before jobs were charged to an account or leased to a worker
+        for column in ("account TEXT", "worker_id TEXT", "lease_until REAL"):
+            try:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+        self._conn.commit()
+
+    @_serialized
+    def create(self, kind: str, payload: dict, priority: int, callback_url: Optional[str],
+               account: Optional[str] = None) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, payload, priority, status, callback_url, account, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), priority, QUEUED, callback_url, account, now, now),
+        )
+        self._conn.commit()
+        return self.get(job_id)
+
+    @_serialized
+    def claim(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Mark a queued job, or a running job whose lease expired, as running on `worker_id`"""
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = ?, lease_until = ?, updated = ? "
+            "WHERE id = ? AND (status = ? OR (status = ? AND (lease_until IS NULL OR lease_until < ?)))",
+            (RUNNING, worker_id, now + lease_seconds, now, job_id, QUEUED, RUNNING, now),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    @_serialized
+    def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND worker_id = ?",
+            (time.time() + lease_seconds, job_id, RUNNING, worker_id),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    @_serialized
+    def finish(self, job_id: str, worker_id: str, status: str, result=None, error: Optional[str] = None) -> bool:
+        """Store the outcome, unless the lease was lost and another worker owns the job now"""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND status = ? AND worker_id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, RUNNING, worker_id),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    @_serialized
+    def release(self, job_id: str, worker_id: str):
+        """Hand a job this worker could not finish back to the queue"""
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND status = ? AND worker_id = ?",
+            (QUEUED, time.time(), job_id, RUNNING, worker_id),
+        )
+        self._conn.commit()
+
+    @_serialized
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    @_serialized
+    def claimable(self) -> list:
+        """Queued jobs and jobs whose worker's lease expired, oldest first within each priority"""
+        rows = self._conn.execute(
+            "SELECT id, priority FROM jobs WHERE status = ? OR (status = ? AND (lease_until IS NULL OR lease_until < ?)) "
+            "ORDER BY priority, created", (QUEUED, RUNNING, time.time())
+        ).fetchall()
+        return [(row["id"], row["priority"]) for row in rows]
+
+    @_serialized
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def public_job(job: dict) -> dict:
+    """Job fields returned by the API"""
+    return {key: job[key] for key in ("id", "kind", "status", "result", "error", "created", "updated")}
+
+
+class JobQueue:
+    """Bounded priority queue served by `workers` asyncio tasks.
+
+    Handlers are called with the job payload and the account it was submitted by.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Callable[[dict, Optional[str]], Awaitable]],
+                 workers: int = 4, max_pending: int = 1000, callback_timeout: float = 10.0,
+                 lease_seconds: float = 60.0, poll_interval: float = 1.0, allow_private_callbacks: bool = False):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.max_pending = max_pending
+        self.callback_timeout = callback_timeout
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.allow_private_callbacks = allow_private_callbacks
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._queued_ids = set()
+        self._tasks = []
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._callbacks = set()
+        self._seq = itertools.count()
+
+    async def _db(self, method, *args, **kwargs):
+        """Call a JobStore method in a worker thread"""
+        return await asyncio.to_thread(method, *args, **kwargs)
+
+    async def start(self):
+        await self._db(self.store.open)
+        self._queue = asyncio.PriorityQueue()
+        # Pick up jobs queued before a restart and jobs whose worker died mid-run
+        restored = await self._enqueue_claimable()
+        if restored:
+            logger.info(f"Restored {restored} unfinished jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._db(self.store.close)
+
+    def _enqueue(self, job_id: str, priority: int):
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put_nowait((priority, next(self._seq), job_id))
+
+    async def _enqueue_claimable(self) -> int:
+        claimable = [(job_id, priority) for job_id, priority in await self._db(self.store.claimable)
+                     if job_id not in self._queued_ids]
+        for job_id, priority in claimable:
+            self._enqueue(job_id, priority)
+        return len(claimable)
+
+    async def _sweep(self):
+        """Periodically take over jobs left behind by workers that stopped"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                taken = await self._enqueue_claimable()
+                if taken:
+                    logger.info(f"Picked up {taken} jobs from the shared queue")
+            except Exception as e:
+                logger.error(f"Job sweep failed: {str(e)}")
+
+    async def submit(self, kind: str, payload: dict, priority: str = "normal", callback_url: Optional[str] = None,
+                     account: Optional[str] = None) -> dict:
+        if self._queue.qsize() >= self.max_pending:
+            raise QueueFull()
+        job = await self._db(self.store.create, kind, payload, PRIORITIES[priority], callback_url, account)
+        self._enqueue(job["id"], job["priority"])
+        logger.info(f"Queued {kind} job {job['id']} ({priority} priority)")
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """Return the job once it has finished or `timeout` seconds have passed.
+
+        Jobs finished by this process wake the caller immediately; jobs run by
+        another process are noticed by polling the store every `poll_interval`.
+        """
+        job = await self._db(self.store.get, job_id)
+        deadline = time.monotonic() + timeout
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            while job is not None and job["status"] not in (SUCCEEDED, FAILED):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+                job = await self._db(self.store.get, job_id)
+        finally:
+            if self._finished.get(job_id) is event and not event.is_set():
+                self._finished.pop(job_id, None)
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} failed on {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self._db(self.store.renew, job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost the lease on job {job_id}")
+                return
+
+    async def _run(self, job_id: str):
+        if not await self._db(self.store.claim, job_id, self.worker_id, self.lease_seconds):
+            return  # finished, or running in another process
+        job = await self._db(self.store.get, job_id)
+        renewer = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await self.handlers[job["kind"]](job["payload"], job["account"])
+            finished = await self._db(self.store.finish, job_id, self.worker_id, SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            # shutting down: the next process to start picks the job up again
+            await self._db(self.store.release, job_id, self.worker_id)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            finished = await self._db(self.store.finish, job_id, self.worker_id, FAILED, error=str(e))
+        finally:
+            renewer.cancel()
+
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+        if finished and job["callback_url"]:
+            finished_job = await self._db(self.store.get, job_id)
+            task = asyncio.create_task(self._send_callback(job["callback_url"], public_job(finished_job)))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _send_callback(self, url: str, job: dict, attempts: int = 3):
+        body = json.dumps(job).encode("utf-8")
+        for attempt in range(attempts):
+            try:
+                await asyncio.to_thread(self._post, url, body)
+                return
+            except Exception as e:
+                logger.warning(f"Callback for job {job['id']} to {url} failed (attempt {attempt + 1}): {str(e)}")
+                await asyncio.sleep(2 ** attempt)
+
+    def _post(self, url: str, body: bytes):
+        # checked again at send time: DNS may have changed since the job was submitted
+        validate_callback_url(url, self.allow_private_callbacks)
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with _callback_opener.open(request, timeout=self.callback_timeout) as response:
+            response.read()
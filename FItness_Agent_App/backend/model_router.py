@@ -0,0 +1,177 @@
+"""Per-agent, per-turn model tiering.
+
+Each agent gets a tier policy: `fast`, `strong` or `auto`. With `auto` every
+model turn is routed by local heuristics: turns that only pick a tool or a
+handoff, or answer a short plain-text question, go to the fast model; the turn
+that writes the final structured output, and any turn of a complex query, goes
+to the strong model. A specialist's first turn goes to the fast model with
+tool_choice="required", so the fast model can only call a tool there and never
+writes the structured output itself. Callers retry on the strong tier when the
+fast tier produces output that fails validation (see `run_agent` in app.py).
+
+Configuration (environment):
+    MODEL_TIERING=1                 enable routing (off by default)
+    LLM_MODEL_FAST=gpt-4o-mini      model used for the fast tier
+    LLM_MODEL_STRONG=gpt-4o         model used for the strong tier
+    MODEL_TIER_POLICY=fitness=fast,workout=auto,nutrition=auto
+    MODEL_COMPLEXITY_THRESHOLD=2    complexity score that forces the strong tier
+"""
+import logging
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+from agents import Model, ModelProvider, ModelSettings, OpenAIProvider
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STRONG = "strong"
+AUTO = "auto"
+TIERS = (FAST, STRONG, AUTO)
+
+DEFAULT_POLICY = "fitness=fast,workout=auto,nutrition=auto"
+
+# Terms that usually mean the plan needs more careful reasoning
+_COMPLEX_TERMS = re.compile(
+    r"\b(injur\w*|pain|pregnan\w*|diabet\w*|allerg\w*|intoleran\w*|medical|condition|surgery|"
+    r"rehab\w*|vegan|vegetarian|keto|marathon|competition|senior|elderly|teen\w*)\b",
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def query_complexity(text: str) -> int:
+    """Cheap local complexity score for a user query (0 = trivial)"""
+    score = len(text.split()) // 40
+    if len(_NUMBER.findall(text)) >= 3:
+        score += 1
+    if _COMPLEX_TERMS.search(text):
+        score += 1
+    if text.count("?") > 1:
+        score += 1
+    return score
+
+
+def _user_text(input) -> str:
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        if isinstance(item, dict) and item.get("role") == "user" and isinstance(item.get("content"), str):
+            parts.append(item["content"])
+    return "\n".join(parts)
+
+
+def _has_tool_output(input, tools: list) -> bool:
+    """Whether the input already holds the output of a call to one of `tools`.
+
+    A handoff is a function call too, but its output belongs to the agent that
+    handed off, not to the specialist now deciding which tool to call.
+    """
+    if isinstance(input, str):
+        return False
+    names = {tool.name for tool in tools}
+    own_calls = {
+        item.get("call_id") for item in input
+        if isinstance(item, dict) and item.get("type") == "function_call" and item.get("name") in names
+    }
+    return any(
+        isinstance(item, dict) and item.get("type") == "function_call_output" and item.get("call_id") in own_calls
+        for item in input
+    )
+
+
+class TieredModel(Model):
+    """Model that forwards each turn to the fast or strong model of its router"""
+
+    def __init__(self, router: "ModelRouter", tier: str):
+        self.router = router
+        self.tier = tier
+
+    def choose_tier(self, input, tools: list, output_schema) -> str:
+        if self.tier != AUTO:
+            return self.tier
+        if query_complexity(_user_text(input)) >= self.router.complexity_threshold:
+            return STRONG
+        if output_schema is None:
+            # triage/handoff decisions and short plain-text answers
+            return FAST
+        if tools and not _has_tool_output(input, tools):
+            # first turn of a specialist: it is expected to call its tool
+            return FAST
+        return STRONG
+
+    def route(self, input, tools: list, output_schema, model_settings: ModelSettings):
+        """Tier and model settings for one turn"""
+        tier = self.choose_tier(input, tools, output_schema)
+        self.router.stats[tier] += 1
+        if self.tier == AUTO and tier == FAST and output_schema is not None:
+            # auto routed a specialist's first turn here: the fast model may pick the tool,
+            # but the structured output is left to the strong model
+            model_settings = model_settings.resolve(ModelSettings(tool_choice="required"))
+        return tier, model_settings
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs):
+        tier, model_settings = self.route(input, tools, output_schema, model_settings)
+        return await self.router.model(tier).get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs)
+
+    def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                        handoffs, tracing, **kwargs):
+        tier, model_settings = self.route(input, tools, output_schema, model_settings)
+        return self.router.model(tier).stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs)
+
+
+class ModelRouter:
+    """Holds the tier configuration and resolves tier names to models.
+
+    Models are resolved lazily through `provider`, so the offline harness can
+    swap in a stub provider without touching the agents.
+    """
+
+    def __init__(self, fast_model: str, strong_model: str, policy: dict,
+                 complexity_threshold: int = 2, enabled: bool = False,
+                 provider: Optional[ModelProvider] = None):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.policy = policy
+        self.complexity_threshold = complexity_threshold
+        self.enabled = enabled
+        self.provider = provider
+        self.stats = Counter()
+
+    @classmethod
+    def from_env(cls, default_model: str) -> "ModelRouter":
+        policy = {}
+        for entry in os.getenv('MODEL_TIER_POLICY', DEFAULT_POLICY).split(","):
+            if not entry.strip():
+                continue
+            key, _, tier = entry.partition("=")
+            tier = tier.strip().lower()
+            if tier not in TIERS:
+                raise ValueError(f"Unknown model tier '{tier}' for agent '{key.strip()}' in MODEL_TIER_POLICY")
+            policy[key.strip()] = tier
+        return cls(
+            fast_model=os.getenv('LLM_MODEL_FAST', default_model),
+            strong_model=os.getenv('LLM_MODEL_STRONG', 'gpt-4o'),
+            policy=policy,
+            complexity_threshold=int(os.getenv('MODEL_COMPLEXITY_THRESHOLD', '2')),
+            enabled=os.getenv('MODEL_TIERING', '0').lower() in ('1', 'true', 'yes'),
+        )
+
+    def model(self, tier: str) -> Model:
+        if self.provider is None:
+            self.provider = OpenAIProvider()
+        return self.provider.get_model(self.fast_model if tier == FAST else self.strong_model)
+
+    def assign(self, agents_by_key: dict):
+        """Point each agent at a TieredModel following the policy (no-op when disabled)"""
+        if not self.enabled:
+            return
+        for key, agent in agents_by_key.items():
+            agent.model = TieredModel(self, self.policy.get(key, AUTO))
+        logger.info(f"Model tiering enabled: fast={self.fast_model}, strong={self.strong_model}, policy={self.policy}")
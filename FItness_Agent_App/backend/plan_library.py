@@ -0,0 +1,194 @@
+"""Precomputed library of workout and meal plans for the common request grid.
+
+Most workout requests are one of MUSCLE_GROUPS x LEVELS and most nutrition
+requests fall into GOALS x GENDERS x weight/height/age buckets. The `build`
+command runs the agents once per grid cell (bounded concurrency) and stores the
+validated plans in SQLite; the API loads the table into memory at startup and
+only runs agents for requests outside the grid.
+
+    python plan_library.py build --db plans.db --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Grid definition ---
+MUSCLE_GROUPS = ["chest", "back", "legs", "arms", "core"]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+GOALS = ["weight loss", "muscle gain", "maintenance"]
+GENDERS = ["male", "female"]
+
+# (lower bound, upper bound, bucket width); values outside the range are out of grid
+WEIGHT_BUCKETS = (40, 150, 10)
+HEIGHT_BUCKETS = (140, 210, 10)
+AGE_BUCKETS = (18, 78, 10)
+
+
+def _bucket(value: float, bounds: tuple) -> Optional[int]:
+    low, high, width = bounds
+    if value < low or value >= high:
+        return None
+    return int((value - low) // width)
+
+
+def _bucket_midpoint(index: int, bounds: tuple) -> float:
+    low, high, width = bounds
+    start = low + index * width
+    # the last bucket is narrower when the range is not a multiple of the width
+    return (start + min(start + width, high)) / 2
+
+
+def _bucket_count(bounds: tuple) -> int:
+    low, high, width = bounds
+    return (high - low + width - 1) // width
+
+
+def workout_key(muscle_group: str, level: str) -> Optional[str]:
+    muscle_group, level = muscle_group.strip().lower(), level.strip().capitalize()
+    if muscle_group not in MUSCLE_GROUPS or level not in LEVELS:
+        return None
+    return f"workout|{muscle_group}|{level}"
+
+
+def nutrition_key(goal: str, weight_kg: float, height_cm: float, age: int, gender: str) -> Optional[str]:
+    goal, gender = goal.strip().lower(), gender.strip().lower()
+    if gender == "m":
+        gender = "male"
+    elif gender == "f":
+        gender = "female"
+    if goal not in GOALS or gender not in GENDERS:
+        return None
+    buckets = (_bucket(weight_kg, WEIGHT_BUCKETS), _bucket(height_cm, HEIGHT_BUCKETS), _bucket(age, AGE_BUCKETS))
+    if None in buckets:
+        return None
+    return f"nutrition|{goal}|{gender}|{buckets[0]}|{buckets[1]}|{buckets[2]}"
+
+
+class PlanLibrary:
+    """Read side of the library: an in-memory dict loaded from the SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._plans = {}
+
+    def load(self) -> "PlanLibrary":
+        if not os.path.exists(self.path):
+            logger.info(f"No plan library at {self.path}, all requests will run agents")
+            return self
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute("SELECT key, plan FROM plans").fetchall()
+        self._plans = {key: json.loads(plan) for key, plan in rows}
+        logger.info(f"Loaded {len(self._plans)} precomputed plans from {self.path}")
+        return self
+
+    def __len__(self):
+        return len(self._plans)
+
+    def workout_plan(self, muscle_group: str, level: str) -> Optional[dict]:
+        key = workout_key(muscle_group, level)
+        return self._plans.get(key) if key else None
+
+    def meal_plan(self, goal: str, weight_kg: float, height_cm: float, age: int, gender: str,
+                  targets: dict) -> Optional[dict]:
+        """Bucketed meal plan with calories and macros replaced by the exact `targets`
+        (the calorie_targets result for this request)"""
+        key = nutrition_key(goal, weight_kg, height_cm, age, gender)
+        plan = self._plans.get(key) if key else None
+        if plan is None:
+            return None
+        return {
+            **plan,
+            "daily_calories": targets["daily_calories"],
+            "protein_grams": targets["macros"]["protein"],
+            "carbs_grams": targets["macros"]["carbs"],
+            "fat_grams": targets["macros"]["fat"],
+        }
+
+
+# --- Offline generation ---
+def grid_requests() -> Iterator[tuple]:
+    """Yield (key, kind, request fields) for every cell of the grid"""
+    for muscle_group in MUSCLE_GROUPS:
+        for level in LEVELS:
+            yield workout_key(muscle_group, level), "workout", {"muscle_group": muscle_group, "level": level}
+    for goal in GOALS:
+        for gender in GENDERS:
+            for w in range(_bucket_count(WEIGHT_BUCKETS)):
+                for h in range(_bucket_count(HEIGHT_BUCKETS)):
+                    for a in range(_bucket_count(AGE_BUCKETS)):
+                        fields = {
+                            "goal": goal,
+                            "weight_kg": _bucket_midpoint(w, WEIGHT_BUCKETS),
+                            "height_cm": _bucket_midpoint(h, HEIGHT_BUCKETS),
+                            "age": int(_bucket_midpoint(a, AGE_BUCKETS)),
+                            "gender": gender,
+                        }
+                        yield nutrition_key(**fields), "nutrition", fields
+
+
+async def build(path: str, concurrency: int, only: Optional[str] = None, rebuild: bool = False):
+    import app
+
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, kind TEXT NOT NULL, plan TEXT NOT NULL, created REAL NOT NULL)")
+    existing = set() if rebuild else {row[0] for row in conn.execute("SELECT key FROM plans")}
+    pending = [cell for cell in grid_requests() if cell[0] not in existing and (only is None or cell[1] == only)]
+    logger.info(f"Generating {len(pending)} plans ({len(existing)} already in {path})")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    done = failed = 0
+
+    async def generate(key: str, kind: str, fields: dict):
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                if kind == "workout":
+                    query = app.workout_prompt(app.WorkoutQueryRequest(**fields))
+                    result = await app.run_agent("workout", app.workout_agent, query)
+                    plan = app.WorkoutPlan.model_validate(result.final_output.model_dump())
+                    if not plan.exercises:
+                        raise ValueError("workout plan has no exercises")
+                else:
+                    query = app.nutrition_prompt(app.NutritionQueryRequest(**fields))
+                    result = await app.run_agent("nutrition", app.nutrition_agent, query)
+                    plan = app.MealPlan.model_validate(result.final_output.model_dump())
+                    if plan.daily_calories <= 0 or not plan.meal_suggestions:
+                        raise ValueError("meal plan is incomplete")
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Skipping {key}: {str(e)}")
+                return
+        conn.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)", (key, kind, plan.model_dump_json(), time.time()))
+        conn.commit()
+        done += 1
+        if done % 50 == 0:
+            logger.info(f"{done}/{len(pending)} plans generated")
+
+    await asyncio.gather(*(generate(*cell) for cell in pending))
+    conn.close()
+    logger.info(f"Done: {done} generated, {failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed workout/meal plan library")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build_parser = subcommands.add_parser("build", help="Run the agents over the request grid")
+    build_parser.add_argument("--db", default=os.getenv("PLAN_LIBRARY", "plans.db"), help="SQLite file to write")
+    build_parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent agent runs")
+    build_parser.add_argument("--only", choices=["workout", "nutrition"], help="Only build one kind of plan")
+    build_parser.add_argument("--rebuild", action="store_true", help="Regenerate plans that already exist")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(build(args.db, args.concurrency, args.only, args.rebuild))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Prompt token budget for the fitness agents.
+
+Offline benchmark that counts the input tokens each agent sends per turn:
+instructions, tool/handoff schemas, output schema and tool outputs. The
+compaction helpers it measures (`compact_prompt`, `compact_json`) live in
+fitness_core.encoding.
+
+    python prompt_budget.py                        # per-agent and query set report
+    python prompt_budget.py --save before.json     # keep a report to compare later
+    python prompt_budget.py --compare before.json  # show savings against a saved report
+
+Token counts use tiktoken's o200k_base encoding (tiktoken downloads it on
+first use and caches it). Without it the script stops, unless `--estimate` is
+given to fall back to a rough word/punctuation estimate; reports made that
+way are labelled as estimates and cannot be compared with real counts.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import sys
+from typing import Optional
+
+from fitness_core.encoding import compact_json
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]|\n\s*| {2,}")
+ESTIMATE = "estimate (word pieces)"
+_encoder = None
+_use_estimate = False
+
+
+def load_tokenizer(allow_estimate: bool = False) -> str:
+    """Load the o200k_base encoding, or switch to the estimate when allowed; returns the tokenizer name"""
+    global _encoder, _use_estimate
+    try:
+        import tiktoken
+        _encoder = tiktoken.get_encoding("o200k_base")
+        _use_estimate = False
+    except Exception as e:
+        if not allow_estimate:
+            raise RuntimeError(f"tiktoken's o200k_base encoding is not available ({type(e).__name__}: {str(e)}). "
+                               "Install tiktoken (it downloads the encoding once), or pass --estimate") from e
+        _encoder, _use_estimate = None, True
+    return tokenizer_name()
+
+
+def tokenizer_name() -> str:
+    return ESTIMATE if _use_estimate else "tiktoken/o200k_base"
+
+
+def count_tokens(text: str) -> int:
+    if _encoder is not None:
+        return len(_encoder.encode(text))
+    if not _use_estimate:
+        load_tokenizer()
+        return count_tokens(text)
+    # Long words split into several BPE tokens; roughly one extra token per 6 characters
+    return sum(1 + len(piece) // 6 for piece in _WORD_PIECES.findall(text))
+
+
+# --- Per-agent measurement ---
+def _tool_schema(tool) -> str:
+    return compact_json({"name": tool.name, "description": tool.description, "parameters": tool.params_json_schema})
+
+
+def _handoff_schema(handoff) -> str:
+    return compact_json({"name": handoff.tool_name, "description": handoff.tool_description,
+                         "parameters": handoff.input_json_schema})
+
+
+def _output_schema(agent) -> Optional[str]:
+    if agent.output_type is None or agent.output_type is str:
+        return None
+    from agents import AgentOutputSchema
+    return compact_json(AgentOutputSchema(agent.output_type).json_schema())
+
+
+def agent_budget(agent) -> dict:
+    """Token counts of the static part of every prompt `agent` sends"""
+    from agents import handoff as make_handoff
+    instructions = agent.instructions if isinstance(agent.instructions, str) else ""
+    tools = [_tool_schema(tool) for tool in agent.tools]
+    handoffs = [_handoff_schema(h if hasattr(h, "tool_name") else make_handoff(h)) for h in agent.handoffs]
+    output_schema = _output_schema(agent)
+    prefix = "\n".join([instructions, *tools, *handoffs, output_schema or ""])
+    budget = {
+        "instructions": count_tokens(instructions),
+        "tools": sum(count_tokens(schema) for schema in tools),
+        "handoffs": sum(count_tokens(schema) for schema in handoffs),
+        "output_schema": count_tokens(output_schema) if output_schema else 0,
+        "prefix_fingerprint": hashlib.sha1(prefix.encode("utf-8")).hexdigest()[:12],
+    }
+    budget["prefix"] = budget["instructions"] + budget["tools"] + budget["handoffs"] + budget["output_schema"]
+    return budget
+
+
+async def tool_output(tool, arguments: dict) -> str:
+    """Invoke a FunctionTool the way the runner does and return its raw output"""
+    from agents.tool_context import ToolContext
+    args_json = json.dumps(arguments)
+    ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id="budget", tool_arguments=args_json)
+    return str(await tool.on_invoke_tool(ctx, args_json))
+
+
+# --- Fixed query set ---
+# Each entry is the sequence of agents a request passes through and the tool
+# call (if any) the agent makes before producing its final output.
+QUERY_SET = [
+    {"name": "general: beginner tips", "query": "Can you give me some general fitness tips for a beginner?",
+     "turns": [("fitness", None)]},
+    {"name": "general: handoff to workout", "query": "What are some good chest exercises I can do at home?",
+     "turns": [("fitness", "handoff:workout"), ("workout", ("get_exercise_info", {"muscle_group": "chest"})), ("workout", None)]},
+    {"name": "general: handoff to nutrition",
+     "query": "I'm 30 years old, male, 175cm tall, and weigh 80kg. How many calories should I eat to lose weight?",
+     "turns": [("fitness", "handoff:nutrition"),
+               ("nutrition", ("calculate_calories", {"goal": "weight loss", "weight_kg": 80, "height_cm": 175, "age": 30, "gender": "male"})),
+               ("nutrition", None)]},
+] + [
+    {"name": f"workout: {group}", "query": f"Create a workout plan for {group} at Intermediate level",
+     "turns": [("workout", ("get_exercise_info", {"muscle_group": group})), ("workout", None)]}
+    for group in ["chest", "back", "legs", "arms", "core"]
+] + [
+    {"name": f"nutrition: {goal}", "query": f"Create a meal plan for {goal} with weight 70.0kg, height 170.0cm, age 30, gender female",
+     "turns": [("nutrition", ("calculate_calories", {"goal": goal, "weight_kg": 70, "height_cm": 170, "age": 30, "gender": "female"})),
+               ("nutrition", None)]}
+    for goal in ["weight loss", "muscle gain", "maintenance"]
+]
+
+
+async def query_budget(agents_by_key: dict, entry: dict) -> int:
+    """Total input tokens over all model turns of one query"""
+    history = count_tokens(entry["query"])
+    total = 0
+    for key, action in entry["turns"]:
+        agent = agents_by_key[key]
+        total += agent_budget(agent)["prefix"] + history
+        if isinstance(action, str):
+            # handoff call plus its short transfer message
+            history += count_tokens(compact_json({"assistant": agents_by_key[action.split(":")[1]].name})) + 10
+        elif action is not None:
+            tool_name, arguments = action
+            tool = next(tool for tool in agent.tools if tool.name == tool_name)
+            history += count_tokens(tool_name) + count_tokens(json.dumps(arguments))
+            history += count_tokens(await tool_output(tool, arguments))
+    return total
+
+
+async def report(agents_by_key: dict) -> dict:
+    result = {"tokenizer": tokenizer_name(), "agents": {}, "queries": {}}
+    for key, agent in agents_by_key.items():
+        result["agents"][key] = agent_budget(agent)
+    for entry in QUERY_SET:
+        result["queries"][entry["name"]] = await query_budget(agents_by_key, entry)
+    result["total"] = sum(result["queries"].values())
+    return result
+
+
+def _print_report(current: dict, baseline: Optional[dict]):
+    def delta(now, before):
+        if before is None:
+            return ""
+        change = now - before
+        pct = f" ({change / before * 100:+.1f}%)" if before else ""
+        return f"  {change:+d}{pct}"
+
+    print(f"Tokenizer: {current['tokenizer']}")
+    if current["tokenizer"] == ESTIMATE:
+        print("All counts below are estimates, not tokenizer counts")
+    print()
+    print(f"{'agent':<12}{'instr':>7}{'tools':>7}{'handoff':>9}{'output':>8}{'prefix':>8}  fingerprint")
+    for key, budget in current["agents"].items():
+        before = (baseline or {}).get("agents", {}).get(key, {}).get("prefix")
+        print(f"{key:<12}{budget['instructions']:>7}{budget['tools']:>7}{budget['handoffs']:>9}"
+              f"{budget['output_schema']:>8}{budget['prefix']:>8}  {budget['prefix_fingerprint']}{delta(budget['prefix'], before)}")
+    print(f"\n{'query':<36}{'input tokens':>14}")
+    for name, tokens in current["queries"].items():
+        before = (baseline or {}).get("queries", {}).get(name)
+        print(f"{name:<36}{tokens:>14}{delta(tokens, before)}")
+    print(f"{'total':<36}{current['total']:>14}{delta(current['total'], (baseline or {}).get('total'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prompt token budgets of the fitness agents")
+    parser.add_argument("--save", help="Write the report as JSON to this file")
+    parser.add_argument("--compare", help="Compare against a report saved with --save")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Use a rough word-piece estimate when tiktoken's encoding is not available")
+    args = parser.parse_args()
+
+    try:
+        load_tokenizer(args.estimate)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    import app
+    agents_by_key = {"fitness": app.fitness_agent, "workout": app.workout_agent, "nutrition": app.nutrition_agent}
+    current = asyncio.run(report(agents_by_key))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("tokenizer") != current["tokenizer"]:
+            sys.exit(f"{args.compare} was counted with {baseline.get('tokenizer')}, "
+                     f"this run with {current['tokenizer']}; the counts are not comparable")
+    _print_report(current, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Replay recorded run traces against a stub model.
+
+Every model turn of a recorded run is served back from the trace, so the
+agents, tools and handoffs execute exactly as they did in production without
+calling the API. Useful for regression checks after prompt/tool changes and
+for measuring framework overhead.
+
+    python replay.py traces/ --endpoint workout --limit 100 --top 5
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from pydantic import TypeAdapter
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseOutputItem, ResponseUsage
+from agents import Model, ModelProvider, ModelResponse, RunConfig, Runner
+from agents.usage import Usage
+
+from trace_store import iter_traces
+
+_OUTPUT_ITEM = TypeAdapter(ResponseOutputItem)
+
+
+class ReplayModel(Model):
+    """Stub model that returns the recorded responses of one trace in order"""
+
+    def __init__(self, responses: list):
+        self._responses = responses
+        self._turn = 0
+
+    def _next(self) -> dict:
+        if self._turn >= len(self._responses):
+            raise RuntimeError(f"Trace has only {len(self._responses)} recorded model turns")
+        recorded = self._responses[self._turn]
+        self._turn += 1
+        return recorded
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs) -> ModelResponse:
+        recorded = self._next()
+        return ModelResponse(
+            output=[_OUTPUT_ITEM.validate_python(item) for item in recorded["output"]],
+            usage=Usage(**recorded["usage"]),
+            response_id=None,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs):
+        """The recorded response as a single `response.completed` event"""
+        recorded = self._next()
+        usage = Usage(**recorded["usage"])
+        response = Response(
+            id=f"replay-{self._turn}",
+            created_at=time.time(),
+            model="replay",
+            object="response",
+            output=[_OUTPUT_ITEM.validate_python(item) for item in recorded["output"]],
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+            usage=ResponseUsage(
+                input_tokens=usage.input_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens=usage.output_tokens,
+                output_tokens_details=usage.output_tokens_details,
+                total_tokens=usage.total_tokens,
+            ),
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=0)
+
+
+class _StubProvider(ModelProvider):
+    """Resolves every model name (and so every tier) to the same stub model"""
+
+    def __init__(self, model: Model):
+        self._model = model
+
+    def get_model(self, model_name):
+        return self._model
+
+
+def _agents_by_endpoint() -> dict:
+    import app
+    return {
+        "general": app.fitness_agent,
+        "workout": app.workout_agent,
+        "nutrition": app.nutrition_agent,
+    }
+
+
+def _model_router(tiering: bool):
+    """Enable model tiering on the app agents so replays measure tier routing"""
+    if not tiering:
+        return None
+    import app
+    if not app.model_router.enabled:
+        app.model_router.enabled = True
+        app.model_router.assign({"fitness": app.fitness_agent, "workout": app.workout_agent, "nutrition": app.nutrition_agent})
+    return app.model_router
+
+
+def _slowest_step(record) -> str:
+    """Slowest model call or tool call of a run, from the timings recorded with it"""
+    steps = [(ms, f"model turn {turn}") for turn, ms in enumerate(record.get("model_ms", []), 1)]
+    steps += [(tool["duration_ms"], f"tool {tool['tool']}") for tool in record.get("tools", [])]
+    if not steps:
+        return ""
+    ms, step = max(steps)
+    return f", slowest {step} {ms:.0f} ms"
+
+
+def _final_output(output):
+    return output.model_dump(mode="json") if hasattr(output, "model_dump") else output
+
+
+async def _run(agent, query: str, run_config: RunConfig, stream: bool):
+    if not stream:
+        return await Runner.run(agent, query, max_turns=20, run_config=run_config)
+    result = Runner.run_streamed(agent, query, max_turns=20, run_config=run_config)
+    async for _ in result.stream_events():
+        pass
+    return result
+
+
+async def replay(directory: str, endpoint=None, limit=None, top: int = 0, tiering: bool = False,
+                 stream: bool = False):
+    agents_by_endpoint = _agents_by_endpoint()
+    router = _model_router(tiering)
+    replayed = mismatched = failed = 0
+    unfinished = Counter()  # recorded runs that did not finish, by status
+    recorded_ms = replay_ms = 0.0
+    turns = Counter()
+    handoffs = Counter()
+    slowest = []
+
+    for record in iter_traces(directory):
+        if endpoint and record["endpoint"] != endpoint:
+            continue
+        if limit is not None and replayed + failed >= limit:
+            break
+
+        handoff_count = sum(1 for item in record["items"] if item["type"] == "handoff_output_item")
+        status = record.get("status", "ok")
+        if status != "ok":
+            # cancelled or failed runs cannot be replayed to an output, but still show up in the top list
+            unfinished[status] += 1
+            slowest.append((record["turns"], handoff_count, record["duration_ms"], status, record["input"],
+                            _slowest_step(record)))
+            continue
+
+        agent = agents_by_endpoint[record["endpoint"]]
+        stub = ReplayModel(record["responses"])
+        if router is not None:
+            # route through the agents' TieredModels, every tier resolving to the stub
+            router.provider = _StubProvider(stub)
+            run_config = RunConfig(tracing_disabled=True)
+        else:
+            run_config = RunConfig(model=stub, tracing_disabled=True)
+        start = time.perf_counter()
+        try:
+            result = await _run(agent, record["input"], run_config, stream)
+        except Exception as e:
+            failed += 1
+            print(f"FAILED  {record['endpoint']}: {record['input']!r}: {str(e)}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+
+        replayed += 1
+        recorded_ms += record["duration_ms"]
+        replay_ms += elapsed
+        turns[record["turns"]] += 1
+        handoffs[handoff_count] += 1
+        slowest.append((record["turns"], handoff_count, record["duration_ms"], status, record["input"],
+                            _slowest_step(record)))
+
+        if _final_output(result.final_output) != record["final_output"]:
+            mismatched += 1
+            print(f"MISMATCH {record['endpoint']}: {record['input']!r}")
+
+    print(f"\nReplayed {replayed} traces ({failed} failed, {mismatched} with a different final output)")
+    if unfinished:
+        print("Not replayed (run did not finish): " + ", ".join(f"{k}: {v}" for k, v in sorted(unfinished.items())))
+    if replayed:
+        print(f"Mean recorded latency: {recorded_ms / replayed:.1f} ms")
+        print(f"Mean replay latency:   {replay_ms / replayed:.2f} ms (framework + tools, no model calls)")
+        print("Turns per run:    " + ", ".join(f"{k}: {v}" for k, v in sorted(turns.items())))
+        print("Handoffs per run: " + ", ".join(f"{k}: {v}" for k, v in sorted(handoffs.items())))
+    if router is not None:
+        routed = sum(router.stats.values())
+        for tier in ("fast", "strong"):
+            share = router.stats[tier] / routed * 100 if routed else 0
+            print(f"Turns on {tier} tier: {router.stats[tier]} ({share:.0f}%)")
+    if top:
+        print(f"\nTop {top} runs by turns:")
+        for run_turns, handoff_count, duration_ms, status, query, step in sorted(slowest, key=lambda run: run[:3], reverse=True)[:top]:
+            print(f"  {run_turns} turns, {handoff_count} handoffs, {duration_ms:.0f} ms{step}, {status}: {query!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded agent runs against a stub model")
+    parser.add_argument("directory", help="Trace directory written by TraceRecorder (TRACE_DIR)")
+    parser.add_argument("--endpoint", choices=["general", "workout", "nutrition"], help="Only replay this endpoint")
+    parser.add_argument("--limit", type=int, help="Maximum number of traces to replay")
+    parser.add_argument("--top", type=int, default=0, help="Print the N runs with the most turns")
+    parser.add_argument("--tiering", action="store_true", help="Route turns through the model tier policy and report the split")
+    parser.add_argument("--stream", action="store_true", help="Replay through Runner.run_streamed instead of Runner.run")
+    args = parser.parse_args()
+    asyncio.run(replay(args.directory, args.endpoint, args.limit, args.top, args.tiering, args.stream))
+
+
+if __name__ == "__main__":
+    main()
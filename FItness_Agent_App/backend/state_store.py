@@ -0,0 +1,197 @@
+"""Cache and rate-limit state shared between backend replicas.
+
+`StateStore` has two tiers: an in-process LRU dict and an optional shared
+Redis-protocol tier (REDIS_URL). Reads try the local tier first, writes go to
+both, counters and single-flight locks live in the shared tier so they are
+accurate across uvicorn workers and pods. When the shared tier is missing or
+fails, the store logs once, keeps working local-only and retries the shared
+tier after `retry_seconds`.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # fall back to JSON when msgpack is not installed
+    msgpack = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # shared tier is optional
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+# --- Serialization ---
+def pack(value: Any) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def unpack(data: bytes) -> Any:
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def pack_model(model: BaseModel) -> bytes:
+    """Field values only, in declaration order; field names are implied by the class"""
+    return pack(list(model.model_dump(mode="json").values()))
+
+
+def unpack_model(cls: Type[BaseModel], data: bytes) -> BaseModel:
+    return cls(**dict(zip(cls.model_fields, unpack(data))))
+
+
+class LocalStore:
+    """In-process tier: bounded LRU with per-entry expiry"""
+
+    def __init__(self, max_items: int = 10000):
+        self.max_items = max_items
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def incr(self, key: str, window: float) -> int:
+        count = (self.get(key) or 0) + 1
+        entry = self._entries.get(key)
+        self.set(key, count, entry[0] - time.monotonic() if entry else window)
+        return count
+
+
+class StateStore:
+    """Local tier plus optional shared tier, degrading to local-only on failure"""
+
+    def __init__(self, redis_url: Optional[str] = None, prefix: str = "fitness:",
+                 local_max_items: int = 10000, local_ttl: float = 60.0, retry_seconds: float = 30.0):
+        self.prefix = prefix
+        self.local = LocalStore(local_max_items)
+        self.local_ttl = local_ttl
+        self.retry_seconds = retry_seconds
+        self._shared = None
+        self._shared_down_until = 0.0
+        self._locks = {}
+        if redis_url:
+            if aioredis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed; using local state only")
+            else:
+                self._shared = aioredis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    @property
+    def shared_available(self) -> bool:
+        return self._shared is not None and time.monotonic() >= self._shared_down_until
+
+    def _shared_failed(self, e: Exception):
+        if time.monotonic() >= self._shared_down_until:
+            logger.warning(f"Shared state tier unavailable, using local state for {self.retry_seconds:.0f}s: {str(e)}")
+        self._shared_down_until = time.monotonic() + self.retry_seconds
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None or not self.shared_available:
+            return value
+        try:
+            value = await self._shared.get(self.prefix + key)
+        except Exception as e:
+            self._shared_failed(e)
+            return None
+        if value is not None:
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.local.set(key, value, min(ttl, self.local_ttl))
+        if not self.shared_available:
+            return
+        try:
+            await self._shared.set(self.prefix + key, value, px=int(ttl * 1000))
+        except Exception as e:
+            self._shared_failed(e)
+
+    async def incr(self, key: str, window: float) -> int:
+        """Increment a counter that expires `window` seconds after its first increment"""
+        if self.shared_available:
+            try:
+                async with self._shared.pipeline(transaction=True) as pipe:
+                    pipe.incr(self.prefix + key)
+                    pipe.pttl(self.prefix + key)
+                    count, ttl = await pipe.execute()
+                if ttl < 0:
+                    # new counter, or one whose expiry was never set (e.g. the process died in between);
+                    # EXPIRE ... NX would do this in one call but needs Redis 7
+                    await self._shared.pexpire(self.prefix + key, int(window * 1000))
+                return count
+            except Exception as e:
+                self._shared_failed(e)
+        return self.local.incr(key, window)
+
+    @asynccontextmanager
+    async def single_flight(self, key: str, ttl: float = 120.0, poll_interval: float = 0.05):
+        """Hold `key` exclusively across tasks, and across processes when the shared
+        tier is up. Callers should re-check the cache after entering."""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]  # lock, tasks using it
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                token = await self._acquire_shared(key, ttl, poll_interval)
+                try:
+                    yield
+                finally:
+                    if token is not None:
+                        await self._release_shared(key, token)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+
+    async def _acquire_shared(self, key: str, ttl: float, poll_interval: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + ttl
+        while self.shared_available and time.monotonic() < deadline:
+            try:
+                if await self._shared.set(f"{self.prefix}lock:{key}", token, nx=True, px=int(ttl * 1000)):
+                    return token
+            except Exception as e:
+                self._shared_failed(e)
+                return None
+            await asyncio.sleep(poll_interval)
+        return None
+
+    async def _release_shared(self, key: str, token: str):
+        # Only delete our own lock; it may have expired and been taken by another process
+        try:
+            lock_key = f"{self.prefix}lock:{key}"
+            if await self._shared.get(lock_key) == token.encode():
+                await self._shared.delete(lock_key)
+        except Exception as e:
+            self._shared_failed(e)
+
+    async def close(self):
+        if self._shared is not None:
+            await self._shared.aclose()
@@ -0,0 +1,47 @@
+"""Scripted stand-in for a model, so agent runs can be tested without an API key"""
+import asyncio
+import json
+
+from agents import Model, ModelResponse, Usage, set_tracing_disabled
+from openai.types.responses import ResponseFunctionToolCall, ResponseOutputMessage, ResponseOutputText
+
+# stub runs have nothing worth exporting to the OpenAI trace viewer
+set_tracing_disabled(True)
+
+
+def text(value: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(id="msg", type="message", role="assistant", status="completed",
+                                 content=[ResponseOutputText(type="output_text", text=value, annotations=[])])
+
+
+def tool_call(name: str, arguments: dict, call_id: str = "call") -> ResponseFunctionToolCall:
+    return ResponseFunctionToolCall(type="function_call", id=call_id, call_id=call_id, name=name,
+                                    arguments=json.dumps(arguments))
+
+
+class StubModel(Model):
+    """Answers each call with the next scripted output item.
+
+    A script entry that is a number instead of an output item makes the call
+    sleep that many seconds first and answer with the entry after it.
+    """
+
+    def __init__(self, *script, input_tokens: int = 10, output_tokens: int = 5):
+        self.script = list(script)
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.calls = 0
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                           tracing, *, previous_response_id=None, conversation_id=None, prompt=None):
+        self.calls += 1
+        entry = self.script.pop(0)
+        if isinstance(entry, (int, float)):
+            await asyncio.sleep(entry)
+            entry = self.script.pop(0)
+        usage = Usage(requests=1, input_tokens=self.input_tokens, output_tokens=self.output_tokens,
+                      total_tokens=self.input_tokens + self.output_tokens)
+        return ModelResponse(output=[entry], usage=usage, response_id=None)
+
+    def stream_response(self, *args, **kwargs):
+        raise NotImplementedError
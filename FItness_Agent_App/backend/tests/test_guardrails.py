@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from agents import Agent, GuardrailFunctionOutput, InputGuardrail, InputGuardrailTripwireTriggered
+
+import fitness_core.guardrails
+from fitness_core import GoalAnalysis
+from guardrails import FAIL_CLOSED, FAIL_OPEN, GuardrailUnavailable, OptimisticGuardrails, parse_timeouts
+from stubs import StubModel, text
+from usage import UsageHooks, UsageMeter
+
+agent = Agent(name="coach", instructions="")
+
+
+def guardrail(name: str, seconds: float, events: list, trip: bool = False, error: bool = False) -> InputGuardrail:
+    async def check(ctx, agent, input_data):
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+        events.append(f"{name} done")
+        if error:
+            raise RuntimeError("model unavailable")
+        return GuardrailFunctionOutput(output_info=name, tripwire_triggered=trip)
+    return InputGuardrail(guardrail_function=check, name=name)
+
+
+class Main:
+    """Agent run stand-in that logs to `events` whether it finished, failed or was cancelled"""
+
+    def __init__(self, seconds: float, error: bool = False):
+        self.seconds = seconds
+        self.error = error
+        self.events = []
+
+    async def __call__(self):
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.events.append("main cancelled")
+            raise
+        if self.error:
+            self.events.append("main failed")
+            raise ValueError("run failed")
+        self.events.append("main done")
+        return "answer"
+
+
+def run(guardrails: OptimisticGuardrails, main: Main):
+    """Return what `guardrails.run` returned, logging "returned" after it did.
+
+    Fails if the run left tasks behind, so cancellations in `main.events`
+    come from the guardrails and not from asyncio.run shutting down.
+    """
+    async def go():
+        try:
+            result = await guardrails.run(agent, "query", main)
+        finally:
+            # cancelled tasks need a loop iteration to unwind; the timeout only bounds a leak
+            leftover = asyncio.all_tasks() - {asyncio.current_task()}
+            if leftover:
+                await asyncio.wait(leftover, timeout=1)
+            assert all(task.done() for task in leftover)
+        main.events.append("returned")
+        return result
+    return asyncio.run(go())
+
+
+def test_passing_checks_overlap_the_run():
+    main = Main(0.1)
+    guardrails = OptimisticGuardrails([guardrail("a", 0.2, main.events), guardrail("b", 0.05, main.events)])
+    assert run(guardrails, main) == "answer"
+    assert main.events == ["b done", "main done", "a done", "returned"]
+
+
+def test_run_output_waits_for_slow_checks():
+    main = Main(0)
+    guardrails = OptimisticGuardrails([guardrail("a", 0.1, main.events)])
+    assert run(guardrails, main) == "answer"
+    assert main.events == ["main done", "a done", "returned"]
+
+
+def test_tripwire_cancels_the_run():
+    main = Main(5)
+    guardrails = OptimisticGuardrails([guardrail("a", 0.05, main.events, trip=True), guardrail("b", 5, main.events)])
+    with pytest.raises(InputGuardrailTripwireTriggered) as raised:
+        run(guardrails, main)
+    assert raised.value.guardrail_result.output.output_info == "a"
+    assert main.events[0] == "a done"
+    assert sorted(main.events[1:]) == ["b cancelled", "main cancelled"]
+
+
+@pytest.mark.parametrize("failure", [{"seconds": 5}, {"seconds": 0, "error": True}])
+def test_failed_check_is_skipped_when_open(failure):
+    main = Main(0.1)
+    guardrails = OptimisticGuardrails([guardrail("a", events=main.events, **failure)], timeout=0.05,
+                                      policy=FAIL_OPEN)
+    assert run(guardrails, main) == "answer"
+    assert main.events[-2:] == ["main done", "returned"]
+
+
+@pytest.mark.parametrize("failure", [{"seconds": 5}, {"seconds": 0, "error": True}])
+def test_failed_check_blocks_when_closed(failure):
+    main = Main(5)
+    guardrails = OptimisticGuardrails([guardrail("a", events=main.events, **failure)], timeout=0.05,
+                                      policy=FAIL_CLOSED)
+    with pytest.raises(GuardrailUnavailable):
+        run(guardrails, main)
+    assert main.events[-1] == "main cancelled"
+
+
+def test_per_guardrail_timeouts():
+    main = Main(0)
+    guardrails = OptimisticGuardrails([guardrail("slow", 0.2, main.events)], timeout=0.05,
+                                      timeouts=parse_timeouts("slow=1, other=2"), policy=FAIL_CLOSED)
+    assert run(guardrails, main) == "answer"
+    assert main.events == ["main done", "slow done", "returned"]
+
+
+def test_failed_run_cancels_the_checks():
+    main = Main(0, error=True)
+    guardrails = OptimisticGuardrails([guardrail("a", 5, main.events)])
+    with pytest.raises(ValueError):
+        run(guardrails, main)
+    assert main.events == ["main failed", "a cancelled"]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        OptimisticGuardrails([], policy="maybe")
+
+
+def test_goal_analysis_is_charged_through_hooks(tmp_path, monkeypatch):
+    analysis = GoalAnalysis(is_realistic=False, reasoning="too fast")
+    analyzer = Agent(name="Goal Analyzer", instructions="", output_type=GoalAnalysis,
+                     model=StubModel(text(analysis.model_dump_json()), input_tokens=30, output_tokens=10))
+    monkeypatch.setattr(fitness_core.guardrails, "build_goal_analysis_agent", lambda: analyzer)
+    meter = UsageMeter(str(tmp_path / "usage.db"))
+
+    output = asyncio.run(fitness_core.guardrails.analyze_fitness_goal(
+        "lose 20 pounds in 2 weeks", UsageHooks(meter, "a", "guardrail")))
+    assert output.tripwire_triggered
+    assert output.output_info == analysis
+    assert meter._windows["a"].tokens == 40
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+from http_cache import _etag_matches, cached_response, dumps, etag_for
+
+PLAN = {"focus_area": "chest", "exercises": ["push-ups"] * 100}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=100)
+
+    async def plan(request: Request):
+        return cached_response(request, PLAN, "public, max-age=60")
+
+    app.add_api_route("/plan", plan, methods=["GET", "POST"])
+    return TestClient(app)
+
+
+def test_etag_is_weak_and_content_addressed():
+    etag = etag_for(dumps(PLAN))
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == etag_for(dumps(dict(PLAN)))
+    assert etag != etag_for(dumps({**PLAN, "focus_area": "back"}))
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('W/"abc"', True),
+    ('"abc"', True),  # weak comparison ignores the W/ prefix
+    ('"xyz", W/"abc"', True),
+    (' "xyz" ,"abc" ', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('W/"ab"', False),
+    ("", False),
+])
+def test_etag_matches(header, matches):
+    assert _etag_matches(header, 'W/"abc"') is matches
+
+
+def test_same_etag_for_every_content_coding(client):
+    gzip = client.get("/plan", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/plan", headers={"Accept-Encoding": "identity"})
+    assert gzip.headers["content-encoding"] == "gzip" and "content-encoding" not in identity.headers
+    assert gzip.headers["etag"] == identity.headers["etag"]
+    assert gzip.headers["etag"].startswith("W/")
+    assert gzip.json() == identity.json() == PLAN
+
+
+def test_get_revalidates_with_304(client):
+    etag = client.get("/plan").headers["etag"]
+    response = client.get("/plan", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["etag"] == etag and response.headers["cache-control"] == "public, max-age=60"
+    assert client.get("/plan", headers={"If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_post_never_gets_304(client):
+    etag = client.get("/plan").headers["etag"]
+    response = client.post("/plan", headers={"If-None-Match": etag})
+    assert response.status_code == 412
+    assert client.post("/plan").status_code == 200
+    assert client.post("/plan", headers={"If-None-Match": 'W/"other"'}).status_code == 200
@@ -0,0 +1,209 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore, validate_callback_url
+
+
+def open_store(path):
+    store = JobStore(str(path))
+    store.open()
+    return store
+
+
+def test_store_is_opened_lazily(tmp_path):
+    path = tmp_path / "jobs.db"
+    JobStore(str(path))
+    assert not path.exists()
+
+
+def test_restart_requeues_queued_jobs(tmp_path):
+    path = tmp_path / "jobs.db"
+    store = open_store(path)
+    job = store.create("general", {"query": "q"}, 1, None, "ip:1")
+    store.close()
+
+    async def main():
+        ran = []
+
+        async def handle(payload, account):
+            ran.append((payload, account))
+            return {"ok": True}
+
+        queue = JobQueue(JobStore(str(path)), {"general": handle}, workers=1)
+        await queue.start()
+        finished = await queue.wait(job["id"], 5)
+        await queue.stop()
+        return ran, finished
+
+    ran, finished = asyncio.run(main())
+    assert ran == [({"query": "q"}, "ip:1")]
+    assert finished["status"] == SUCCEEDED
+    assert finished["result"] == {"ok": True}
+
+
+def test_live_lease_is_not_run_twice(tmp_path):
+    path = tmp_path / "jobs.db"
+    store = open_store(path)
+    job = store.create("general", {}, 1, None)
+    assert store.claim(job["id"], "other-worker", 60)
+    assert not store.claim(job["id"], "me", 60)
+
+    async def main():
+        ran = []
+
+        async def handle(payload, account):
+            ran.append(payload)
+
+        queue = JobQueue(JobStore(str(path)), {"general": handle}, workers=1)
+        await queue.start()
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return ran
+
+    assert asyncio.run(main()) == []
+    assert store.get(job["id"])["status"] == RUNNING
+    assert store.get(job["id"])["worker_id"] == "other-worker"
+    store.close()
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    path = tmp_path / "jobs.db"
+    store = open_store(path)
+    job = store.create("general", {}, 1, None)
+    assert store.claim(job["id"], "dead-worker", 0.05)
+    time.sleep(0.1)
+
+    async def main():
+        async def handle(payload, account):
+            return "done"
+
+        queue = JobQueue(JobStore(str(path)), {"general": handle}, workers=1)
+        await queue.start()
+        finished = await queue.wait(job["id"], 5)
+        await queue.stop()
+        return queue.worker_id, finished
+
+    worker_id, finished = asyncio.run(main())
+    assert finished["status"] == SUCCEEDED
+    assert finished["worker_id"] == worker_id
+    # the dead worker can no longer overwrite the outcome
+    assert not store.finish(job["id"], "dead-worker", FAILED, error="late")
+    store.close()
+
+
+def test_shared_queues_run_each_job_once(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def main():
+        ran = []
+
+        async def handle(payload, account):
+            ran.append(payload["n"])
+            await asyncio.sleep(0.01)
+
+        first = JobQueue(JobStore(str(path)), {"general": handle}, workers=2, lease_seconds=0.2)
+        second = JobQueue(JobStore(str(path)), {"general": handle}, workers=2, lease_seconds=0.2)
+        await first.start()
+        jobs = [await first.submit("general", {"n": n}) for n in range(10)]
+        await second.start()  # sees the same queued rows
+        for job in jobs:
+            await first.wait(job["id"], 5)
+        await asyncio.sleep(0.3)  # let the sweeps run once
+        await first.stop()
+        await second.stop()
+        return ran
+
+    assert sorted(asyncio.run(main())) == list(range(10))
+
+
+def test_wait_polls_jobs_finished_elsewhere(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def main():
+        queue = JobQueue(JobStore(str(path)), {}, workers=0, poll_interval=0.05)
+        await queue.start()
+        job = await queue.submit("general", {})
+        other = open_store(path)
+        other.claim(job["id"], "other-process", 60)
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.1)
+            other.finish(job["id"], "other-process", SUCCEEDED, result=1)
+
+        started = time.monotonic()
+        _, finished = await asyncio.gather(finish_elsewhere(), queue.wait(job["id"], 5))
+        elapsed = time.monotonic() - started
+        other.close()
+        await queue.stop()
+        return finished, elapsed
+
+    finished, elapsed = asyncio.run(main())
+    assert finished["status"] == SUCCEEDED
+    assert elapsed < 1
+
+
+def test_stopping_releases_running_jobs(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def main():
+        started = asyncio.Event()
+
+        async def handle(payload, account):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue = JobQueue(JobStore(str(path)), {"general": handle}, workers=1)
+        await queue.start()
+        job = await queue.submit("general", {})
+        await started.wait()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(main())
+    store = open_store(path)
+    assert store.get(job["id"])["status"] == QUEUED
+    store.close()
+
+
+def test_locked_database_does_not_block_the_event_loop(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def main():
+        queue = JobQueue(JobStore(str(path), busy_timeout=5), {}, workers=0)
+        await queue.start()
+        other_process = sqlite3.connect(str(path), isolation_level=None)
+        other_process.execute("BEGIN IMMEDIATE")  # holds the write lock
+        submit = asyncio.create_task(queue.submit("general", {}))
+        for _ in range(5):
+            await asyncio.sleep(0.01)  # the loop keeps running while the insert waits for the lock
+        assert not submit.done()
+        other_process.execute("COMMIT")
+        job = await submit
+        other_process.close()
+        await queue.stop()
+        return job
+
+    assert asyncio.run(main())["status"] == QUEUED
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http://127.0.0.1/hook",
+    "http://localhost:8000/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.1/hook",
+    "http://[::1]/hook",
+    "http://0.0.0.0/hook",
+])
+def test_callback_urls_to_internal_addresses_are_rejected(url):
+    with pytest.raises(ValueError):
+        validate_callback_url(url)
+
+
+def test_callback_urls_can_allow_private_targets():
+    validate_callback_url("http://127.0.0.1:9000/hook", allow_private=True)
+    validate_callback_url("http://93.184.215.14/hook")
@@ -0,0 +1,103 @@
+import asyncio
+
+from agents import Agent, ModelProvider, ModelSettings, RunConfig, Runner, function_tool
+from pydantic import BaseModel
+
+from model_router import AUTO, FAST, STRONG, ModelRouter, TieredModel, _has_tool_output, query_complexity
+from stubs import StubModel, text, tool_call
+
+
+class Plan(BaseModel):
+    exercises: list
+
+
+@function_tool
+def lookup(muscle_group: str) -> str:
+    """Exercises for a muscle group"""
+    return "push-ups"
+
+
+def router(policy=None, provider=None) -> ModelRouter:
+    return ModelRouter("fast-model", "strong-model", policy or {}, enabled=True, provider=provider)
+
+
+def call(call_id, name):
+    return {"type": "function_call", "call_id": call_id, "name": name, "arguments": "{}"}
+
+
+def output(call_id):
+    return {"type": "function_call_output", "call_id": call_id, "output": "..."}
+
+
+def test_has_tool_output_counts_only_own_tools():
+    question = {"role": "user", "content": "chest workout"}
+    assert not _has_tool_output("chest workout", [lookup])
+    assert not _has_tool_output([question], [lookup])
+    assert not _has_tool_output([question, call("h", "transfer_to_workout"), output("h")], [lookup])
+    assert not _has_tool_output([question, call("t", "lookup")], [lookup])  # called, no output yet
+    assert _has_tool_output([question, call("h", "transfer_to_workout"), output("h"), call("t", "lookup"), output("t")], [lookup])
+
+
+def test_choose_tier():
+    model = TieredModel(router(), AUTO)
+    first_turn = [{"role": "user", "content": "chest workout"}, call("h", "transfer_to_workout"), output("h")]
+    after_tool = first_turn + [call("t", "lookup"), output("t")]
+    assert model.choose_tier(first_turn, [], None) == FAST  # triage or plain answer
+    assert model.choose_tier(first_turn, [lookup], Plan) == FAST  # specialist picks its tool
+    assert model.choose_tier(after_tool, [lookup], Plan) == STRONG  # final structured output
+    assert model.choose_tier(first_turn, [], Plan) == STRONG  # no tool to call first
+    complex_query = "I have knee pain and diabetes, 80kg 180cm 45 years, what should I do? and eat?"
+    assert query_complexity(complex_query) >= 2
+    assert model.choose_tier(complex_query, [], None) == STRONG
+    assert TieredModel(router(), FAST).choose_tier(after_tool, [lookup], Plan) == FAST
+    assert TieredModel(router(), STRONG).choose_tier(first_turn, [], None) == STRONG
+
+
+def test_fast_specialist_turn_must_call_a_tool():
+    model = TieredModel(router(), AUTO)
+    first_turn = [{"role": "user", "content": "chest workout"}]
+    settings = ModelSettings(temperature=0.3)
+    tier, routed = model.route(first_turn, [lookup], Plan, settings)
+    assert (tier, routed.tool_choice, routed.temperature) == (FAST, "required", 0.3)
+    tier, routed = model.route(first_turn, [], None, settings)
+    assert (tier, routed.tool_choice) == (FAST, None)
+    # a specialist pinned to the fast tier must still be able to answer
+    tier, routed = TieredModel(router(), FAST).route(first_turn, [lookup], Plan, settings)
+    assert (tier, routed.tool_choice) == (FAST, None)
+
+
+class RecordingModel(StubModel):
+    def __init__(self, name, calls, *script):
+        super().__init__(*script)
+        self.name = name
+        self.log = calls
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        self.log.append((self.name, model_settings.tool_choice))
+        return await super().get_response(system_instructions, input, model_settings, *args, **kwargs)
+
+
+class Provider(ModelProvider):
+    def __init__(self, models):
+        self.models = models
+
+    def get_model(self, model_name):
+        return self.models[model_name]
+
+
+def test_handoff_route_is_fast_fast_strong():
+    calls = []
+    provider = Provider({
+        "fast-model": RecordingModel("fast", calls, tool_call("transfer_to_workout", {}, "h"),
+                                     tool_call("lookup", {"muscle_group": "chest"}, "t")),
+        "strong-model": RecordingModel("strong", calls, text(Plan(exercises=["push-ups"]).model_dump_json())),
+    })
+    tiers = router({"fitness": FAST, "workout": AUTO}, provider)
+    workout = Agent(name="Workout", instructions="", tools=[lookup], output_type=Plan)
+    fitness = Agent(name="Fitness", instructions="", handoffs=[workout])
+    tiers.assign({"fitness": fitness, "workout": workout})
+
+    result = asyncio.run(Runner.run(fitness, "What should I do for chest?", run_config=RunConfig(tracing_disabled=True)))
+    assert result.final_output == Plan(exercises=["push-ups"])
+    assert calls == [("fast", None), ("fast", "required"), ("strong", None)]
+    assert tiers.stats == {FAST: 2, STRONG: 1}
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+
+import pytest
+
+from fitness_core.calculations import calorie_targets
+from plan_library import (AGE_BUCKETS, HEIGHT_BUCKETS, WEIGHT_BUCKETS, PlanLibrary, _bucket, _bucket_count,
+                          _bucket_midpoint, grid_requests, nutrition_key, workout_key)
+
+
+@pytest.mark.parametrize("value, index", [(40, 0), (49.99, 0), (50, 1), (149.99, 10), (150, None), (39.9, None)])
+def test_bucket_includes_lower_and_excludes_upper_bound(value, index):
+    assert _bucket(value, WEIGHT_BUCKETS) == index
+
+
+def test_bucket_count_rounds_up_partial_buckets():
+    assert _bucket_count(WEIGHT_BUCKETS) == 11
+    assert _bucket_count(AGE_BUCKETS) == 6
+    assert _bucket_count((0, 25, 10)) == 3
+    assert _bucket(24, (0, 25, 10)) == 2
+
+
+@pytest.mark.parametrize("bounds", [WEIGHT_BUCKETS, HEIGHT_BUCKETS, AGE_BUCKETS, (0, 25, 10)])
+def test_every_midpoint_falls_in_its_own_bucket(bounds):
+    for index in range(_bucket_count(bounds)):
+        assert _bucket(_bucket_midpoint(index, bounds), bounds) == index
+
+
+def test_grid_keys_are_unique_and_in_grid():
+    keys = [key for key, _, _ in grid_requests()]
+    assert None not in keys
+    assert len(keys) == len(set(keys)) == 5 * 3 + 3 * 2 * 11 * 7 * 6
+
+
+def test_workout_key_normalises_case_and_whitespace():
+    assert workout_key(" Chest ", "beginner") == workout_key("chest", "Beginner") == "workout|chest|Beginner"
+    assert workout_key("neck", "Beginner") is None
+    assert workout_key("chest", "expert") is None
+
+
+def test_nutrition_key_normalises_goal_and_gender():
+    key = nutrition_key("weight loss", 80, 180, 30, "male")
+    assert nutrition_key(" Weight Loss ", 80, 180, 30, "M") == key
+    assert nutrition_key("weight loss", 80, 180, 30, " m ") == key
+    assert nutrition_key("weight loss", 80, 180, 30, "F") == nutrition_key("weight loss", 80, 180, 30, "female") != key
+    # same buckets, different exact values
+    assert nutrition_key("weight loss", 89.9, 189, 37, "male") == key
+    assert nutrition_key("weight loss", 90, 180, 30, "male") != key
+    assert nutrition_key("bulking", 80, 180, 30, "male") is None
+    assert nutrition_key("weight loss", 80, 180, 30, "other") is None
+    assert nutrition_key("weight loss", 80, 180, 17, "male") is None
+
+
+def test_meal_plan_is_rescaled_to_exact_targets(tmp_path):
+    path = tmp_path / "plans.db"
+    stored = {"daily_calories": 2000, "protein_grams": 150, "carbs_grams": 200, "fat_grams": 60,
+              "meal_suggestions": ["oats"], "notes": "bucket plan"}
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE plans (key TEXT PRIMARY KEY, kind TEXT NOT NULL, plan TEXT NOT NULL, created REAL NOT NULL)")
+        conn.execute("INSERT INTO plans VALUES (?, ?, ?, 0)",
+                     (nutrition_key("muscle gain", 75, 175, 25, "female"), "nutrition", json.dumps(stored)))
+    library = PlanLibrary(str(path)).load()
+    assert len(library) == 1
+
+    targets = calorie_targets("muscle gain", 77.5, 172, 27, "F")
+    plan = library.meal_plan("muscle gain", 77.5, 172, 27, "F", targets)
+    assert plan["daily_calories"] == targets["daily_calories"]
+    assert (plan["protein_grams"], plan["carbs_grams"], plan["fat_grams"]) == (
+        targets["macros"]["protein"], targets["macros"]["carbs"], targets["macros"]["fat"])
+    assert plan["meal_suggestions"] == ["oats"] and plan["notes"] == "bucket plan"
+    assert library.meal_plan("muscle gain", 95, 172, 27, "F", targets) is None
+
+
+def test_missing_library_serves_nothing(tmp_path):
+    library = PlanLibrary(str(tmp_path / "none.db")).load()
+    assert len(library) == 0
+    assert library.workout_plan("chest", "Beginner") is None
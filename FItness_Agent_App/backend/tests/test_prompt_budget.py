@@ -0,0 +1,25 @@
+import sys
+
+import pytest
+
+import prompt_budget
+
+
+@pytest.fixture
+def no_tiktoken(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", None)  # import fails as if not installed
+    monkeypatch.setattr(prompt_budget, "_encoder", None)
+    monkeypatch.setattr(prompt_budget, "_use_estimate", False)
+
+
+def test_missing_tokenizer_is_an_error_by_default(no_tiktoken):
+    with pytest.raises(RuntimeError, match="--estimate"):
+        prompt_budget.load_tokenizer()
+    with pytest.raises(RuntimeError):
+        prompt_budget.count_tokens("hello")
+
+
+def test_estimate_is_opt_in_and_labelled(no_tiktoken):
+    assert prompt_budget.load_tokenizer(allow_estimate=True) == prompt_budget.ESTIMATE
+    assert prompt_budget.count_tokens("hello, world") == 3
+    assert prompt_budget.count_tokens("internationalisation") == 4
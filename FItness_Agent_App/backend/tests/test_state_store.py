@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import fakeredis
+from pydantic import BaseModel
+
+from state_store import LocalStore, StateStore, pack_model, unpack_model
+
+
+def shared_store(server, **kwargs) -> StateStore:
+    store = StateStore(**kwargs)
+    store._shared = fakeredis.aioredis.FakeRedis(server=server)
+    return store
+
+
+def test_local_store_expires_and_evicts():
+    local = LocalStore(max_items=2)
+    local.set("a", b"1", ttl=60)
+    local.set("b", b"2", ttl=0.01)
+    local.set("c", b"3", ttl=60)
+    assert local.get("a") is None  # least recently used, evicted
+    time.sleep(0.02)
+    assert local.get("b") is None  # expired
+    assert local.get("c") == b"3"
+
+
+def test_pack_model_round_trip():
+    class Plan(BaseModel):
+        name: str
+        sets: int
+
+    plan = Plan(name="squats", sets=3)
+    assert unpack_model(Plan, pack_model(plan)) == plan
+
+
+def test_replicas_share_values_and_counters():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = shared_store(server), shared_store(server)
+        await first.set("answer", b"42", ttl=60)
+        assert await second.get("answer") == b"42"
+        assert [await first.incr("rate", 60), await second.incr("rate", 60)] == [1, 2]
+        assert 0 < await first._shared.ttl("fitness:rate") <= 60
+
+    asyncio.run(scenario())
+
+
+def test_counters_expire_on_redis_6():
+    async def scenario():
+        server = fakeredis.FakeServer(version=(6, 2))
+        store = shared_store(server)
+        assert [await store.incr("rate", 60) for _ in range(3)] == [1, 2, 3]
+        assert 0 < await store._shared.ttl("fitness:rate") <= 60
+        assert store.shared_available  # the shared tier stays up
+        # a counter left without an expiry gets one on its next increment
+        await store._shared.set("fitness:stuck", 5)
+        assert await store.incr("stuck", 60) == 6
+        assert 0 < await store._shared.ttl("fitness:stuck") <= 60
+
+    asyncio.run(scenario())
+
+
+def test_counter_window_is_not_extended_by_increments():
+    async def scenario():
+        store = shared_store(fakeredis.FakeServer())
+        await store.incr("rate", 60)
+        await store._shared.pexpire("fitness:rate", 5000)
+        await store.incr("rate", 60)
+        assert await store._shared.pttl("fitness:rate") <= 5000
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_runs_once_across_replicas():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        stores = [shared_store(server), shared_store(server)]
+        produced = []
+
+        async def cached(store):
+            value = await store.get("plan")
+            if value is not None:
+                return value
+            async with store.single_flight("plan", poll_interval=0.01):
+                value = await store.get("plan")
+                if value is not None:
+                    return value
+                produced.append(store)
+                await asyncio.sleep(0.05)
+                await store.set("plan", b"done", ttl=60)
+                return b"done"
+
+        results = await asyncio.gather(*(cached(stores[i % 2]) for i in range(6)))
+        assert results == [b"done"] * 6
+        assert len(produced) == 1
+        assert await stores[0]._shared.get("fitness:lock:plan") is None  # released
+        assert not stores[0]._locks and not stores[1]._locks
+
+    asyncio.run(scenario())
+
+
+def test_degrades_to_local_state_and_recovers():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        store = shared_store(server, retry_seconds=0.05)
+        server.connected = False
+        await store.set("k", b"v", ttl=60)  # shared write fails, local write still happens
+        assert not store.shared_available
+        assert await store.get("k") == b"v"
+        assert [await store.incr("rate", 60), await store.incr("rate", 60)] == [1, 2]
+        async with store.single_flight("k"):  # local lock only
+            pass
+
+        server.connected = True
+        await asyncio.sleep(0.06)
+        assert store.shared_available
+        assert await store.incr("rate", 60) == 1  # shared counter starts fresh
+        assert await store._shared.get("fitness:rate") == b"1"
+
+    asyncio.run(scenario())
+
+
+def test_missing_redis_url_is_local_only():
+    store = StateStore(None)
+    assert not store.shared_available
+    assert asyncio.run(store.incr("rate", 60)) == 1
@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+import pytest
+from agents import Agent, MaxTurnsExceeded, RunConfig, Runner, function_tool
+
+import trace_store
+from replay import ReplayModel
+from stubs import StubModel, text, tool_call
+from trace_store import (FRAME_HEADER, SEGMENT_SUFFIX, RunTimer, TraceRecorder, _decode_batch, _encode_batch,
+                         iter_traces, trace_record)
+
+
+@function_tool
+def lookup(name: str) -> str:
+    """Look something up"""
+    return name
+
+
+def recorded_run(*script, max_turns=10):
+    """Run a stub agent with a RunTimer and return (result or run_data, timings)"""
+    agent = Agent(name="coach", instructions="", tools=[lookup], model=StubModel(*script))
+    timer = RunTimer()
+
+    async def main():
+        try:
+            return await Runner.run(agent, "hi", max_turns=max_turns, hooks=timer)
+        except MaxTurnsExceeded as e:
+            return e.run_data
+    return asyncio.run(main()), timer.timings()
+
+
+@pytest.mark.parametrize("msgpack", [True, False])
+@pytest.mark.parametrize("zstandard", [True, False])
+def test_batches_round_trip_with_every_codec(monkeypatch, msgpack, zstandard):
+    if not msgpack:
+        monkeypatch.setattr(trace_store, "msgpack", None)
+    if not zstandard:
+        monkeypatch.setattr(trace_store, "zstandard", None)
+    records = [{"input": "plan for legs", "turns": 2, "items": [{"type": "x", "n": 1.5}]}] * 3
+    codec, payload = _encode_batch(records)
+    assert _decode_batch(codec, payload) == records
+
+
+def test_truncated_trailing_frame_is_skipped(tmp_path):
+    frames = []
+    for batch in ([{"n": 1}], [{"n": 2}]):
+        codec, payload = _encode_batch(batch)
+        frames.append(FRAME_HEADER.pack(codec, len(payload)) + payload)
+    (tmp_path / f"{1:020d}-1{SEGMENT_SUFFIX}").write_bytes(frames[0] + frames[1][:-3])
+    (tmp_path / f"{2:020d}-1{SEGMENT_SUFFIX}").write_bytes(frames[1] + frames[0][:2])
+    assert [record["n"] for record in iter_traces(str(tmp_path))] == [1, 2]
+
+
+def test_full_queue_drops_and_counts():
+    recorder = TraceRecorder("unused", max_pending=2)  # not started, so nothing drains the queue
+    for _ in range(5):
+        recorder.record("general", "coach", "hi", None, 0.1)
+    assert recorder.dropped == 3
+
+
+def test_recorder_writes_and_reads_back(tmp_path):
+    run, timings = recorded_run(tool_call("lookup", {"name": "x"}), text("done"))
+    recorder = TraceRecorder(str(tmp_path), flush_interval=0.01)
+    recorder.start()
+    recorder.record("general", "coach", "hi", run, 0.5, timings=timings)
+    recorder.record("general", "coach", "bye", None, 0.1, "cancelled")
+    recorder.close()
+
+    finished, cancelled = iter_traces(str(tmp_path))
+    assert finished["status"] == "ok" and finished["final_output"] == "done"
+    assert finished["turns"] == 2 and len(finished["model_ms"]) == 2
+    assert [tool["tool"] for tool in finished["tools"]] == ["lookup"]
+    assert all("start_ms" in response and "duration_ms" in response for response in finished["responses"])
+    assert cancelled["status"] == "cancelled" and cancelled["turns"] == 0 and cancelled["last_agent"] is None
+
+
+def test_old_segments_are_deleted_on_rotation(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), segment_bytes=1, flush_interval=0.01, max_segments=3, max_age=0)
+    recorder.start()
+    for n in range(6):
+        recorder.record("general", "coach", f"q{n}", None, 0.1)
+        recorder.close()  # one batch per segment
+        recorder.start()
+    recorder.close()
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(SEGMENT_SUFFIX)]) == 3
+    assert [record["input"] for record in iter_traces(str(tmp_path))] == ["q3", "q4", "q5"]
+
+
+def test_segments_past_max_age_are_deleted(tmp_path):
+    old = tmp_path / f"{1:020d}-1{SEGMENT_SUFFIX}"
+    old.write_bytes(b"")
+    recorder = TraceRecorder(str(tmp_path), flush_interval=0.01, max_age=3600)
+    recorder.start()
+    recorder.record("general", "coach", "hi", None, 0.1)
+    recorder.close()
+    assert not old.exists()
+    assert len(list(iter_traces(str(tmp_path)))) == 1
+
+
+def test_max_turns_run_keeps_its_timings():
+    run, timings = recorded_run(*(tool_call("lookup", {"name": str(n)}, f"call{n}") for n in range(2)), max_turns=2)
+    record = trace_record(0, "general", "coach", "hi", run, 1.0, "max_turns", "too many turns", timings)
+    assert record["turns"] == 2 and len(record["model_ms"]) == 2 and len(record["tools"]) == 2
+    assert record["final_output"] is None
+
+
+def test_replay_model_streams_recorded_responses():
+    run, timings = recorded_run(tool_call("lookup", {"name": "x"}), text("done"))
+    record = trace_record(0, "general", "coach", "hi", run, 1.0, timings=timings)
+    agent = Agent(name="coach", instructions="", tools=[lookup])
+
+    async def main():
+        result = Runner.run_streamed(agent, "hi", run_config=RunConfig(model=ReplayModel(record["responses"])))
+        async for _ in result.stream_events():
+            pass
+        return result
+
+    result = asyncio.run(main())
+    assert result.final_output == "done"
+    assert len(result.raw_responses) == 2
+    assert result.context_wrapper.usage.total_tokens == 30
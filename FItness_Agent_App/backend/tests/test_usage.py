@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from agents import Agent, MaxTurnsExceeded, Runner, Usage, function_tool
+
+from stubs import StubModel, text, tool_call
+from usage import QuotaExceeded, SlidingWindow, UsageHooks, UsageMeter
+
+
+@function_tool
+def lookup(name: str) -> str:
+    """Look something up"""
+    return name
+
+
+def test_sliding_window_expires_old_buckets():
+    window = SlidingWindow(bucket_seconds=10, buckets=3)
+    window.add(100, requests=1, tokens=50)
+    window.add(115, requests=1, tokens=20)
+    assert window.totals(125) == (2, 70)
+    assert window.retry_after(125) == 6  # the 100-110 bucket leaves the window at 130
+    assert window.totals(130) == (1, 20)
+    assert window.totals(150) == (0, 0)
+
+
+def test_sliding_window_keeps_order_when_clock_steps_back():
+    window = SlidingWindow(bucket_seconds=10, buckets=3)
+    window.add(120, tokens=5)
+    window.add(105, tokens=5)
+    assert window.totals(125) == (0, 10)
+
+
+def test_request_and_endpoint_quotas(tmp_path):
+    meter = UsageMeter(str(tmp_path / "usage.db"), request_quota=2, endpoint_token_quotas={"general": 100})
+    meter.begin("a", "workout")
+    meter.begin("a", "general")
+    with pytest.raises(QuotaExceeded) as raised:
+        meter.begin("a", "general")
+    assert raised.value.quota == "request"
+    meter.check("b", "general")  # other accounts are unaffected
+
+    meter = UsageMeter(str(tmp_path / "usage.db"), endpoint_token_quotas={"general": 100})
+    meter.record("a", "general", Usage(input_tokens=80, output_tokens=20))
+    with pytest.raises(QuotaExceeded) as raised:
+        meter.check("a", "general")
+    assert raised.value.quota == "general token"
+    meter.check("a", "workout")
+    meter.begin(None, "general")  # unmetered runs are never limited
+
+
+def test_usage_db_is_opened_on_start(tmp_path):
+    path = tmp_path / "usage.db"
+    UsageMeter(str(path))
+    assert not path.exists()
+
+
+def test_windows_are_restored_after_restart(tmp_path):
+    path = str(tmp_path / "usage.db")
+
+    async def first_process():
+        meter = UsageMeter(path, token_quota=100)
+        meter.start()
+        meter.begin("a", "general")
+        meter.record("a", "general", Usage(input_tokens=90, output_tokens=10))
+        await meter.stop()
+
+    async def second_process():
+        meter = UsageMeter(path, token_quota=100)
+        meter.start()
+        try:
+            with pytest.raises(QuotaExceeded):
+                meter.check("a")
+            return meter.report(0)
+        finally:
+            await meter.stop()
+
+    asyncio.run(first_process())
+    report = asyncio.run(second_process())
+    [account] = report["accounts"]
+    assert account["account"] == "a"
+    assert account["window"] == {"requests": 1, "tokens": 100}
+    assert account["endpoints"]["general"] == {"requests": 1, "input_tokens": 90, "output_tokens": 10}
+
+
+def test_cancelled_run_is_charged_for_finished_responses(tmp_path):
+    meter = UsageMeter(str(tmp_path / "usage.db"))
+    model = StubModel(tool_call("lookup", {"name": "x"}), 60, text("never"))
+    agent = Agent(name="coach", instructions="", tools=[lookup], model=model)
+
+    async def main():
+        meter.begin("a", "general")
+        run = asyncio.create_task(Runner.run(agent, "hi", hooks=UsageHooks(meter, "a", "general")))
+        while model.calls < 2:
+            await asyncio.sleep(0.01)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+
+    asyncio.run(main())
+    window = meter._windows["a"]
+    assert (window.requests, window.tokens) == (1, 15)  # the first response, not the cancelled second call
+
+
+def test_max_turns_run_is_charged_for_every_response(tmp_path):
+    meter = UsageMeter(str(tmp_path / "usage.db"))
+    model = StubModel(*(tool_call("lookup", {"name": str(n)}, f"call{n}") for n in range(3)))
+    agent = Agent(name="coach", instructions="", tools=[lookup], model=model)
+
+    async def main():
+        meter.begin("a", "general")
+        with pytest.raises(MaxTurnsExceeded):
+            await Runner.run(agent, "hi", max_turns=3, hooks=UsageHooks(meter, "a", "general"))
+
+    asyncio.run(main())
+    assert model.calls == 3
+    window = meter._windows["a"]
+    assert (window.requests, window.tokens) == (1, 45)
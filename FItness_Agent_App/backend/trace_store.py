@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+from agents import HandoffOutputItem, ItemHelpers, MessageOutputItem, RunHooks, ToolCallItem, ToolCallOutputItem
+
+try:
+    import msgpack
+except ImportError:  # fall back to JSON when msgpack is not installed
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # fall back to zlib when zstandard is not installed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# --- On-disk format ---
+# A segment file is a sequence of frames. Each frame holds one batch of run
+# records and starts with a 5 byte header: codec flags (1 byte) followed by the
+# payload length (4 bytes, big endian).
+FRAME_HEADER = struct.Struct(">BI")
+CODEC_MSGPACK = 0x01
+CODEC_ZSTD = 0x02
+SEGMENT_SUFFIX = ".trace"
+
+_STOP = object()
+
+
+def _encode_batch(records: list) -> tuple:
+    """Serialize and compress a batch of records, returning (codec, payload)"""
+    codec = 0
+    if msgpack is not None:
+        raw = msgpack.packb(records, use_bin_type=True)
+        codec |= CODEC_MSGPACK
+    else:
+        raw = json.dumps(records, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        payload = zstandard.ZstdCompressor(level=3).compress(raw)
+        codec |= CODEC_ZSTD
+    else:
+        payload = zlib.compress(raw, 6)
+    return codec, payload
+
+
+def _decode_batch(codec: int, payload: bytes) -> list:
+    """Inverse of _encode_batch"""
+    if codec & CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this trace segment")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    if codec & CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this trace segment")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+def _jsonable(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return str(value)
+
+
+class RunTimer(RunHooks):
+    """Run hooks that time every model call and tool call, forwarding each event to `hooks`.
+
+    Times are milliseconds since the timer was created, i.e. since the run started.
+    """
+
+    def __init__(self, hooks: Optional[RunHooks] = None):
+        self.hooks = hooks or RunHooks()
+        self._start = time.perf_counter()
+        self._llm_start = None
+        self._tool_starts = {}
+        self.responses = []  # {"start_ms", "duration_ms"} per model response, in order
+        self.tools = []  # {"agent", "tool", "start_ms", "duration_ms"} per finished tool call
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def timings(self) -> dict:
+        return {"responses": list(self.responses), "tools": list(self.tools)}
+
+    async def on_agent_start(self, context, agent):
+        await self.hooks.on_agent_start(context, agent)
+
+    async def on_agent_end(self, context, agent, output):
+        await self.hooks.on_agent_end(context, agent, output)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        await self.hooks.on_handoff(context, from_agent, to_agent)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._llm_start = self._now_ms()
+        await self.hooks.on_llm_start(context, agent, system_prompt, input_items)
+
+    async def on_llm_end(self, context, agent, response):
+        if self._llm_start is not None:
+            self.responses.append({"start_ms": round(self._llm_start, 3),
+                                   "duration_ms": round(self._now_ms() - self._llm_start, 3)})
+            self._llm_start = None
+        await self.hooks.on_llm_end(context, agent, response)
+
+    async def on_tool_start(self, context, agent, tool):
+        # tools of one turn run concurrently; the call id tells them apart
+        self._tool_starts[getattr(context, "tool_call_id", None) or tool.name] = self._now_ms()
+        await self.hooks.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        start = self._tool_starts.pop(getattr(context, "tool_call_id", None) or tool.name, None)
+        if start is not None:
+            self.tools.append({"agent": agent.name, "tool": tool.name, "start_ms": round(start, 3),
+                               "duration_ms": round(self._now_ms() - start, 3)})
+        await self.hooks.on_tool_end(context, agent, tool, result)
+
+
+def trace_record(timestamp: float, endpoint: str, agent_name: str, query, result, duration: float,
+                 status: str = "ok", error: Optional[str] = None, timings: Optional[dict] = None) -> dict:
+    """Build a compact, serializable record from a Runner.run result.
+
+    `result` is a RunResult for finished runs, the `run_data` (RunErrorDetails)
+    of a failed run, or None when nothing is known about the run (e.g. it was
+    cancelled before the SDK returned anything). `timings` is `RunTimer.timings()`;
+    its response times are merged into the matching response entries.
+    """
+    timings = timings or {"responses": [], "tools": []}
+    new_items = result.new_items if result is not None else []
+    raw_responses = result.raw_responses if result is not None else []
+    items = []
+    for item in new_items:
+        entry = {"type": item.type, "agent": item.agent.name}
+        if isinstance(item, ToolCallItem):
+            entry["tool"] = getattr(item.raw_item, "name", None)
+            entry["arguments"] = getattr(item.raw_item, "arguments", None)
+        elif isinstance(item, ToolCallOutputItem):
+            entry["output"] = _jsonable(item.output)
+        elif isinstance(item, HandoffOutputItem):
+            entry["source"] = item.source_agent.name
+            entry["target"] = item.target_agent.name
+        elif isinstance(item, MessageOutputItem):
+            entry["text"] = ItemHelpers.text_message_output(item)
+        items.append(entry)
+
+    responses = []
+    for index, response in enumerate(raw_responses):
+        entry = {
+            "output": [output.model_dump(mode="json", exclude_none=True) for output in response.output],
+            "usage": {
+                "requests": response.usage.requests,
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "total_tokens": response.usage.total_tokens,
+            },
+        }
+        if index < len(timings["responses"]):
+            entry.update(timings["responses"][index])
+        responses.append(entry)
+
+    return {
+        "ts": timestamp,
+        "endpoint": endpoint,
+        "agent": agent_name,
+        "input": query,
+        "duration_ms": round(duration * 1000, 3),
+        "status": status,
+        "error": error,
+        "turns": len(raw_responses),
+        "last_agent": result.last_agent.name if result is not None else None,
+        "items": items,
+        "responses": responses,
+        "model_ms": [timing["duration_ms"] for timing in timings["responses"]],
+        "tools": timings["tools"],
+        "final_output": _jsonable(getattr(result, "final_output", None)),
+    }
+
+
+class TraceRecorder:
+    """Append-only, batched writer for run traces.
+
+    `record` only puts the run on a bounded in-memory queue; building the record,
+    encoding, compression and file I/O all happen on a background thread.
+    Segments are rotated once they grow past `segment_bytes`; on rotation the
+    oldest segments are deleted so at most `max_segments` remain and none is
+    older than `max_age` seconds (0 disables the age limit). When the writer
+    falls behind by `max_pending` runs, new runs are dropped and counted in
+    `dropped` instead of growing memory.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 batch_size: int = 256, flush_interval: float = 1.0, max_pending: int = 10000,
+                 max_segments: int = 16, max_age: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._segment = None
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """Runs that were not written: queue overflow, unserializable records or write errors"""
+        return self._dropped
+
+    def _drop(self, count: int):
+        with self._dropped_lock:
+            self._dropped += count
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._worker, name="trace-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Recording run traces to {self.directory}")
+
+    def record(self, endpoint: str, agent_name: str, query, result, duration: float,
+               status: str = "ok", error: Optional[str] = None, timings: Optional[dict] = None):
+        """Queue a run for writing (see `trace_record`). Never blocks the request path."""
+        try:
+            self._queue.put_nowait((time.time(), endpoint, agent_name, query, result, duration, status, error, timings))
+        except queue.Full:
+            self._drop(1)
+            if self._dropped % 1000 == 1:
+                logger.warning(f"Trace writer is behind, dropped {self._dropped} traces so far")
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        if self._dropped:
+            logger.warning(f"Dropped {self._dropped} traces")
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            if batch:
+                self._write_batch(batch)
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write_batch(self, batch: list):
+        records = []
+        for entry in batch:
+            try:
+                records.append(trace_record(*entry))
+            except Exception as e:
+                self._drop(1)
+                logger.warning(f"Dropping unserializable trace for {entry[1]}: {str(e)}")
+        if not records:
+            return
+        try:
+            codec, payload = _encode_batch(records)
+            segment = self._current_segment()
+            segment.write(FRAME_HEADER.pack(codec, len(payload)))
+            segment.write(payload)
+            segment.flush()
+        except Exception as e:
+            self._drop(len(records))
+            logger.error(f"Failed to write {len(records)} traces: {str(e)}")
+
+    def _current_segment(self):
+        if self._segment is not None and self._segment.tell() >= self.segment_bytes:
+            self._segment.close()
+            self._segment = None
+        if self._segment is None:
+            name = f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+            self._segment = open(os.path.join(self.directory, name), "ab")
+            self._prune(name)
+        return self._segment
+
+    def _prune(self, current: str):
+        """Delete the oldest segments beyond `max_segments` and those older than `max_age`"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX) and name != current)
+        expired = names[:max(0, len(names) - (self.max_segments - 1))]
+        if self.max_age:
+            # names start with the creation time in nanoseconds
+            cutoff = time.time_ns() - int(self.max_age * 1e9)
+            expired += [name for name in names[len(expired):] if int(name.split("-", 1)[0]) < cutoff]
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.warning(f"Could not delete old trace segment {name}: {str(e)}")
+
+
+def iter_traces(directory: str) -> Iterator[dict]:
+    """Yield every recorded run in write order, skipping a truncated trailing frame"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as segment:
+            while True:
+                header = segment.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                codec, length = FRAME_HEADER.unpack(header)
+                payload = segment.read(length)
+                if len(payload) < length:
+                    logger.warning(f"Truncated frame at the end of {name}")
+                    break
+                yield from _decode_batch(codec, payload)
@@ -0,0 +1,288 @@
+"""Per-client token and request accounting with quotas.
+
+Every agent run is charged to an account: the API key or client address of
+the HTTP request (see `client_id` in app.py), or the submitter of a job.
+Tokens are charged per model response through `UsageHooks`, so runs that fail,
+hit max_turns or are cancelled pay for the calls they made.
+Counters live in memory as sliding windows of fixed-width buckets, so a quota
+check is a dict lookup and a comparison. All updates happen on the event loop
+thread, so no locks are needed. Bucket deltas are flushed to SQLite
+periodically. The stored buckets restore the windows after a restart and back
+the admin usage report.
+
+Configuration (environment, read by app.py):
+    USAGE_DB=usage.db                 SQLite file for flushed counters
+    USAGE_WINDOW_SECONDS=3600         quota window
+    USAGE_TOKEN_QUOTA=0               tokens per account per window (0 = unlimited)
+    USAGE_REQUEST_QUOTA=0             agent runs per account per window (0 = unlimited)
+    USAGE_ENDPOINT_TOKEN_QUOTAS=general=20000,workout=50000
+                                      optional per-account token quota for single endpoints
+    USAGE_FLUSH_SECONDS=10            how often counters are written to USAGE_DB
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from agents import Agent, ModelResponse, RunContextWrapper, RunHooks
+
+logger = logging.getLogger(__name__)
+
+# Account the current request or job is charged to; None leaves the run unmetered (e.g. plan library builds)
+current_account: ContextVar[Optional[str]] = ContextVar("usage_account", default=None)
+
+
+class QuotaExceeded(Exception):
+    """The account has used up a quota for the current window"""
+
+    def __init__(self, account: str, quota: str, retry_after: int):
+        super().__init__(f"{quota} quota exceeded, retry in {retry_after}s")
+        self.account = account
+        self.quota = quota
+        self.retry_after = retry_after
+
+
+def parse_quotas(text: str) -> Dict[str, int]:
+    """Parse `endpoint=tokens,...` into a dict"""
+    quotas = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        key, _, value = entry.partition("=")
+        quotas[key.strip()] = int(value)
+    return quotas
+
+
+class SlidingWindow:
+    """Request and token totals over the last `buckets` buckets of `bucket_seconds`"""
+
+    def __init__(self, bucket_seconds: float, buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self._counts = deque()  # [bucket index, requests, tokens], oldest first
+        self.requests = 0
+        self.tokens = 0
+
+    def _expire(self, index: int):
+        while self._counts and self._counts[0][0] <= index - self.buckets:
+            _, requests, tokens = self._counts.popleft()
+            self.requests -= requests
+            self.tokens -= tokens
+
+    def add(self, now: float, requests: int = 0, tokens: int = 0):
+        index = int(now // self.bucket_seconds)
+        self._expire(index)
+        if self._counts and self._counts[-1][0] >= index:
+            # same bucket (or the clock stepped back): keep the deque ordered
+            self._counts[-1][1] += requests
+            self._counts[-1][2] += tokens
+        else:
+            self._counts.append([index, requests, tokens])
+        self.requests += requests
+        self.tokens += tokens
+
+    def totals(self, now: float):
+        self._expire(int(now // self.bucket_seconds))
+        return self.requests, self.tokens
+
+    def retry_after(self, now: float) -> int:
+        """Seconds until the oldest bucket leaves the window"""
+        if not self._counts:
+            return 1
+        return max(1, int((self._counts[0][0] + self.buckets) * self.bucket_seconds - now) + 1)
+
+
+class UsageMeter:
+    """In-memory quota windows per account, flushed to SQLite in the background"""
+
+    def __init__(self, path: str, window_seconds: float = 3600, buckets: int = 60,
+                 token_quota: int = 0, request_quota: int = 0, endpoint_token_quotas: Optional[dict] = None,
+                 flush_interval: float = 10.0):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.token_quota = token_quota
+        self.request_quota = request_quota
+        self.endpoint_token_quotas = endpoint_token_quotas or {}
+        self.flush_interval = flush_interval
+        self._windows: Dict[str, SlidingWindow] = {}  # account, or account|endpoint for endpoint quotas
+        self._pending = {}  # (account, endpoint, bucket start) -> [requests, input tokens, output tokens]
+        self._task = None
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                account TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                requests INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                PRIMARY KEY (account, endpoint, bucket)
+            )
+        """)
+        self._conn.commit()
+
+    def _window(self, key: str) -> SlidingWindow:
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = SlidingWindow(self.bucket_seconds, self.buckets)
+        return window
+
+    def _count(self, account: str, endpoint: str, now: float, requests: int, input_tokens: int, output_tokens: int):
+        tokens = input_tokens + output_tokens
+        self._window(account).add(now, requests, tokens)
+        if endpoint in self.endpoint_token_quotas:
+            self._window(f"{account}|{endpoint}").add(now, requests, tokens)
+        bucket = int(now // self.bucket_seconds * self.bucket_seconds)
+        pending = self._pending.get((account, endpoint, bucket))
+        if pending is None:
+            pending = self._pending[(account, endpoint, bucket)] = [0, 0, 0]
+        pending[0] += requests
+        pending[1] += input_tokens
+        pending[2] += output_tokens
+
+    def check(self, account: Optional[str], endpoint: Optional[str] = None):
+        """Raise QuotaExceeded when `account` has no budget left for another run"""
+        if account is None:
+            return
+        now = time.time()
+        window = self._windows.get(account)
+        if window is not None:
+            requests, tokens = window.totals(now)
+            if self.request_quota and requests >= self.request_quota:
+                raise QuotaExceeded(account, "request", window.retry_after(now))
+            if self.token_quota and tokens >= self.token_quota:
+                raise QuotaExceeded(account, "token", window.retry_after(now))
+        endpoint_quota = self.endpoint_token_quotas.get(endpoint)
+        window = self._windows.get(f"{account}|{endpoint}") if endpoint_quota else None
+        if window is not None and window.totals(now)[1] >= endpoint_quota:
+            raise QuotaExceeded(account, f"{endpoint} token", window.retry_after(now))
+
+    def begin(self, account: Optional[str], endpoint: str):
+        """Check the quotas and count one run, before any model call is made"""
+        if account is None:
+            return
+        self.check(account, endpoint)
+        self._count(account, endpoint, time.time(), 1, 0, 0)
+
+    def record(self, account: Optional[str], endpoint: str, usage):
+        """Add the token usage of a model response or run (an agents `Usage`)"""
+        if account is None:
+            return
+        self._count(account, endpoint, time.time(), 0, usage.input_tokens, usage.output_tokens)
+
+    # --- Persistence ---
+    def restore(self):
+        """Reload the buckets of the current window, so quotas survive a restart"""
+        now = time.time()
+        rows = self._conn.execute(
+            "SELECT account, endpoint, bucket, requests, input_tokens + output_tokens FROM usage "
+            "WHERE bucket > ? ORDER BY bucket", (now - self.window_seconds,)
+        ).fetchall()
+        for account, endpoint, bucket, requests, tokens in rows:
+            self._window(account).add(bucket, requests, tokens)
+            if endpoint in self.endpoint_token_quotas:
+                self._window(f"{account}|{endpoint}").add(bucket, requests, tokens)
+        if rows:
+            logger.info(f"Restored usage for {len(self._windows)} accounts")
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        if pending:
+            self._conn.executemany(
+                "INSERT INTO usage (account, endpoint, bucket, requests, input_tokens, output_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (account, endpoint, bucket) DO UPDATE SET "
+                "requests = requests + excluded.requests, input_tokens = input_tokens + excluded.input_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens",
+                [(*key, *counts) for key, counts in pending.items()],
+            )
+            self._conn.commit()
+        # drop windows of accounts that have been idle for a whole window
+        now = time.time()
+        for key in [key for key, window in self._windows.items() if window.totals(now) == (0, 0)]:
+            del self._windows[key]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush usage counters: {str(e)}")
+
+    def start(self):
+        self.open()
+        self.restore()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+        self._conn.close()
+        self._conn = None
+
+    # --- Reporting ---
+    def report(self, since: float, account: Optional[str] = None, limit: int = 50) -> dict:
+        """Usage per account and endpoint since `since` (epoch seconds), heaviest accounts first"""
+        self.flush()
+        query = ("SELECT account, endpoint, SUM(requests), SUM(input_tokens), SUM(output_tokens) FROM usage "
+                 "WHERE bucket >= ?")
+        params = [int(since // self.bucket_seconds * self.bucket_seconds)]
+        if account is not None:
+            query += " AND account = ?"
+            params.append(account)
+        query += " GROUP BY account, endpoint"
+
+        now = time.time()
+        accounts = {}
+        for name, endpoint, requests, input_tokens, output_tokens in self._conn.execute(query, params):
+            entry = accounts.get(name)
+            if entry is None:
+                window = self._windows.get(name)
+                window_requests, window_tokens = window.totals(now) if window is not None else (0, 0)
+                entry = accounts[name] = {
+                    "account": name,
+                    "requests": 0,
+                    "tokens": 0,
+                    "window": {"requests": window_requests, "tokens": window_tokens},
+                    "endpoints": {},
+                }
+            entry["requests"] += requests
+            entry["tokens"] += input_tokens + output_tokens
+            entry["endpoints"][endpoint] = {
+                "requests": requests, "input_tokens": input_tokens, "output_tokens": output_tokens,
+            }
+        return {
+            "since": since,
+            "window_seconds": self.window_seconds,
+            "quotas": {
+                "tokens": self.token_quota,
+                "requests": self.request_quota,
+                "endpoint_tokens": self.endpoint_token_quotas,
+            },
+            "accounts": sorted(accounts.values(), key=lambda entry: entry["tokens"], reverse=True)[:limit],
+        }
+
+
+class UsageHooks(RunHooks):
+    """Run hooks that charge each model response to `account` as soon as it arrives"""
+
+    def __init__(self, meter: UsageMeter, account: str, endpoint: str):
+        self.meter = meter
+        self.account = account
+        self.endpoint = endpoint
+
+    async def on_llm_end(self, context: RunContextWrapper, agent: Agent, response: ModelResponse) -> None:
+        self.meter.record(self.account, self.endpoint, response.usage)
@@ -0,0 +1,40 @@
+"""Shared models, tools and agents for the fitness coach scripts and API.
+
+Names are resolved on first access, so `import fitness_core` is cheap and the
+Agents SDK is only imported once a tool or agent is actually used:
+
+    from fitness_core import WorkoutPlan, calorie_targets   # pydantic only
+    from fitness_core import get_exercise_info              # loads the Agents SDK
+    from fitness_core import workout_agent                  # builds the agent
+"""
+import importlib
+
+_EXPORTS = {
+    "WorkoutPlan": "models",
+    "MealPlan": "models",
+    "GoalAnalysis": "models",
+    "EXERCISE_DATA": "calculations",
+    "exercise_info": "calculations",
+    "calorie_targets": "calculations",
+    "compact_json": "encoding",
+    "compact_prompt": "encoding",
+    "get_exercise_info": "tools",
+    "calculate_calories": "tools",
+    "workout_agent": "coaches",
+    "nutrition_agent": "coaches",
+    "fitness_agent": "coaches",
+    "goal_analysis_agent": "coaches",
+    "analyze_fitness_goal": "guardrails",
+    "fitness_goal_guardrail": "guardrails",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,56 @@
+"""Import-time benchmark for fitness_core.
+
+Each case runs in a fresh interpreter so nothing is already imported, and the
+median of several runs is reported:
+
+    python -m fitness_core.bench --runs 7
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CASES = [
+    ("import fitness_core", "import fitness_core"),
+    ("models only", "from fitness_core import WorkoutPlan, MealPlan"),
+    ("calorie math", "from fitness_core import calorie_targets"),
+    ("tools (loads the Agents SDK)", "from fitness_core import get_exercise_info"),
+    ("one agent", "from fitness_core import workout_agent"),
+    ("all agents", "from fitness_core import fitness_agent"),
+    ("baseline: import agents", "import agents"),
+]
+
+_TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(statement: str, runs: int) -> float:
+    """Median seconds to execute `statement` in a fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(statement=statement)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure fitness_core import and agent construction time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per case")
+    args = parser.parse_args()
+    print(f"{'case':<32}{'median ms':>10}")
+    for name, statement in CASES:
+        print(f"{name:<32}{time_import(statement, args.runs) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
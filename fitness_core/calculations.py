@@ -0,0 +1,94 @@
+"""Plain-Python exercise lookup and calorie math behind the agent tools.
+
+Kept free of the Agents SDK so the API, the plan library and scripts can call
+them directly without paying for the SDK import.
+"""
+from typing import Optional
+
+EXERCISE_DATA = {
+    "chest": [
+        "Push-ups: 3 sets of 10-15 reps",
+        "Bench Press: 3 sets of 8-12 reps",
+        "Chest Flyes: 3 sets of 12-15 reps",
+        "Incline Push-ups: 3 sets of 10-15 reps"
+    ],
+    "back": [
+        "Pull-ups: 3 sets of 6-10 reps",
+        "Bent-over Rows: 3 sets of 8-12 reps",
+        "Lat Pulldowns: 3 sets of 10-12 reps",
+        "Superman Holds: 3 sets of 30 seconds"
+    ],
+    "legs": [
+        "Squats: 3 sets of 10-15 reps",
+        "Lunges: 3 sets of 10 per leg",
+        "Calf Raises: 3 sets of 15-20 reps",
+        "Glute Bridges: 3 sets of 15 reps"
+    ],
+    "arms": [
+        "Bicep Curls: 3 sets of 10-12 reps",
+        "Tricep Dips: 3 sets of 10-15 reps",
+        "Hammer Curls: 3 sets of 10-12 reps",
+        "Overhead Tricep Extensions: 3 sets of 10-12 reps"
+    ],
+    "core": [
+        "Planks: 3 sets of 30-60 seconds",
+        "Crunches: 3 sets of 15-20 reps",
+        "Russian Twists: 3 sets of 20 total reps",
+        "Mountain Climbers: 3 sets of 20 total reps"
+    ]
+}
+
+
+def exercise_info(muscle_group: str) -> Optional[dict]:
+    """Exercises for a muscle group, or None when the group is unknown"""
+    muscle_group = muscle_group.lower()
+    if muscle_group not in EXERCISE_DATA:
+        return None
+    return {
+        "muscle_group": muscle_group,
+        "exercises": EXERCISE_DATA[muscle_group],
+        "rest_between_sets": "60-90s"
+    }
+
+
+def calorie_targets(goal: str, weight_kg: float, height_cm: float, age: int, gender: str) -> dict:
+    """Daily calorie target and macronutrient grams for the given stats and goal"""
+    # Calculate BMR (Basal Metabolic Rate) using Mifflin-St Jeor Equation
+    if gender.lower() in ['male', 'm']:
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
+    else:  # female
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
+
+    # Use a moderate activity level
+    tdee = bmr * 1.55
+
+    # Adjust based on goal
+    if goal.lower() == "weight loss":
+        calorie_target = tdee - 500  # 500 calorie deficit
+    elif goal.lower() == "muscle gain":
+        calorie_target = tdee + 300  # 300 calorie surplus
+    else:  # maintenance
+        calorie_target = tdee
+
+    # Calculate macros (simplified)
+    if goal.lower() == "weight loss":
+        protein_pct, fat_pct, carb_pct = 0.40, 0.30, 0.30
+    elif goal.lower() == "muscle gain":
+        protein_pct, fat_pct, carb_pct = 0.30, 0.25, 0.45
+    else:  # maintenance or general fitness
+        protein_pct, fat_pct, carb_pct = 0.30, 0.30, 0.40
+
+    # Protein and carbs have 4 calories per gram, fat has 9 calories per gram
+    protein_grams = round(calorie_target * protein_pct / 4)
+    fat_grams = round(calorie_target * fat_pct / 9)
+    carb_grams = round(calorie_target * carb_pct / 4)
+
+    return {
+        "goal": goal,
+        "daily_calories": round(calorie_target),
+        "macros": {
+            "protein": protein_grams,
+            "fat": fat_grams,
+            "carbs": carb_grams
+        }
+    }
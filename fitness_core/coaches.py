@@ -0,0 +1,106 @@
+"""Production fitness agents, each built on first access.
+
+    from fitness_core import workout_agent   # builds the workout agent only
+
+Builders are cached, so every access returns the same Agent instance. The model
+name is read from LLM_MODEL_NAME when the agent is built, so load .env files
+before the first access.
+"""
+import os
+from functools import lru_cache
+
+from .encoding import compact_prompt
+from .models import GoalAnalysis, MealPlan, WorkoutPlan
+
+
+def default_model() -> str:
+    return os.getenv('LLM_MODEL_NAME', 'gpt-4o-mini')
+
+
+# --- Specialized Agents ---
+@lru_cache(maxsize=None)
+def build_workout_agent():
+    from agents import Agent
+    from .tools import get_exercise_info
+    return Agent(
+        name="Workout Specialist",
+        handoff_description="Specialist agent for creating workout plans",
+        instructions=compact_prompt("""
+        You are a workout specialist who creates effective exercise routines.
+        Use the get_exercise_info tool to find exercises for specific muscle groups.
+        Create a WorkoutPlan that matches the user's fitness level and goals.
+        For weight loss, include a mix of cardio and strength exercises.
+        Always include form tips in the notes to prevent injury.
+        Ensure the output strictly follows the WorkoutPlan schema.
+        """),
+        model=default_model(),
+        tools=[get_exercise_info],
+        output_type=WorkoutPlan
+    )
+
+
+@lru_cache(maxsize=None)
+def build_nutrition_agent():
+    from agents import Agent
+    from .tools import calculate_calories
+    return Agent(
+        name="Nutrition Specialist",
+        handoff_description="Specialist agent for nutrition advice and meal planning",
+        instructions=compact_prompt("""
+        You are a nutrition specialist who helps users with meal planning and nutrition advice.
+        Use the calculate_calories tool to determine appropriate calorie and macronutrient targets.
+        Provide a MealPlan with meal suggestions that support the user's fitness goals.
+        Focus on practical, sustainable nutrition advice.
+        Ensure the output strictly follows the MealPlan schema.
+        """),
+        model=default_model(),
+        tools=[calculate_calories],
+        output_type=MealPlan
+    )
+
+
+# --- Main Fitness Agent ---
+@lru_cache(maxsize=None)
+def build_fitness_agent():
+    from agents import Agent
+    return Agent(
+        name="Fitness Coach with Specialized Agents",
+        instructions=compact_prompt("""
+        You are a fitness coach who helps users achieve their health and fitness goals.
+        For queries about workouts or exercises, immediately hand off to the Workout Specialist.
+        For queries about nutrition, diet, or meal plans, immediately hand off to the Nutrition Specialist.
+        For general fitness questions, provide brief, practical advice without using tools or handoffs.
+        Do not attempt to answer specialized workout or nutrition questions yourself.
+        """),
+        model=default_model(),
+        handoffs=[build_workout_agent(), build_nutrition_agent()]
+    )
+
+
+# --- Guardrail Agent ---
+@lru_cache(maxsize=None)
+def build_goal_analysis_agent():
+    from agents import Agent
+    return Agent(
+        name="Goal Analyzer",
+        instructions=compact_prompt("""
+        You analyze fitness goals to determine if they are realistic and healthy.
+        Losing more than 2 pounds per week is generally considered unsafe.
+        """),
+        model=default_model(),
+        output_type=GoalAnalysis
+    )
+
+
+_BUILDERS = {
+    "workout_agent": build_workout_agent,
+    "nutrition_agent": build_nutrition_agent,
+    "fitness_agent": build_fitness_agent,
+    "goal_analysis_agent": build_goal_analysis_agent,
+}
+
+
+def __getattr__(name):
+    if name in _BUILDERS:
+        return _BUILDERS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,13 @@
+import inspect
+import json
+
+
+def compact_prompt(text: str) -> str:
+    """Strip source indentation and blank lines from triple-quoted instructions,
+    which would otherwise be sent as whitespace tokens on every turn"""
+    return "\n".join(line for line in inspect.cleandoc(text).splitlines() if line.strip())
+
+
+def compact_json(value) -> str:
+    """JSON encoding for tool outputs: no whitespace between tokens"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
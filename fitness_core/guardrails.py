@@ -0,0 +1,30 @@
+from typing import Optional
+
+from agents import GuardrailFunctionOutput, RunHooks, Runner
+
+from .coaches import build_goal_analysis_agent
+from .models import GoalAnalysis
+
+
+# --- Guardrails ---
+async def analyze_fitness_goal(input_data, hooks: Optional[RunHooks] = None) -> GuardrailFunctionOutput:
+    """Guardrail output that trips when the user's fitness goal is unrealistic or unsafe.
+
+    `hooks` are passed to the analysis run, e.g. to meter its model calls.
+    """
+    analysis_prompt = f"The user said: {input_data}.\nAnalyze if their fitness goal is realistic and healthy."
+    result = await Runner.run(build_goal_analysis_agent(), analysis_prompt, hooks=hooks)
+    analysis = result.final_output_as(GoalAnalysis)
+    return GuardrailFunctionOutput(
+        output_info=analysis,
+        tripwire_triggered=not analysis.is_realistic,
+    )
+
+
+async def fitness_goal_guardrail(ctx, agent, input_data) -> GuardrailFunctionOutput:
+    """Input guardrail around analyze_fitness_goal.
+
+    Errors propagate, so the caller decides whether a failed check blocks the
+    request or lets it through.
+    """
+    return await analyze_fitness_goal(input_data)
@@ -0,0 +1,28 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+# --- Structured Output Models ---
+class WorkoutPlan(BaseModel):
+    """Workout recommendation with exercises and details"""
+    focus_area: str = Field(description="Primary focus of the workout (e.g., 'upper body', 'cardio')")
+    difficulty: str = Field(description="Difficulty level (Beginner, Intermediate, Advanced)")
+    exercises: List[str] = Field(description="List of recommended exercises")
+    notes: str = Field(description="Additional notes or form tips")
+
+
+class MealPlan(BaseModel):
+    """Basic meal plan recommendation"""
+    daily_calories: int = Field(description="Recommended daily calorie intake")
+    protein_grams: int = Field(description="Daily protein target in grams")
+    carbs_grams: int = Field(description="Daily carbohydrate target in grams")
+    fat_grams: int = Field(description="Daily fat target in grams")
+    meal_suggestions: List[str] = Field(description="Simple meal ideas")
+    notes: str = Field(description="Dietary advice and tips")
+
+
+class GoalAnalysis(BaseModel):
+    """Analysis of user fitness goals"""
+    is_realistic: bool = Field(description="Whether the goal is realistic and healthy")
+    reasoning: str = Field(description="Explanation of the analysis")
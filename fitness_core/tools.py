@@ -0,0 +1,30 @@
+import logging
+
+from agents import function_tool
+
+from .calculations import calorie_targets, exercise_info
+from .encoding import compact_json
+
+logger = logging.getLogger(__name__)
+
+
+# --- Tools ---
+@function_tool
+def get_exercise_info(muscle_group: str) -> str:
+    """Get a list of exercises for a specific muscle group"""
+    logger.debug(f"Calling get_exercise_info with muscle_group: {muscle_group}")
+    result = exercise_info(muscle_group)
+    if result is None:
+        logger.warning(f"Muscle group {muscle_group} not found")
+        return f"Exercise information for {muscle_group} is not available."
+    logger.debug(f"get_exercise_info result: {result}")
+    return compact_json(result)
+
+
+@function_tool
+def calculate_calories(goal: str, weight_kg: float, height_cm: float, age: int, gender: str) -> str:
+    """Calculate daily calorie needs and macronutrient breakdown based on user stats and goals"""
+    logger.debug(f"Calling calculate_calories with goal: {goal}, weight_kg: {weight_kg}, height_cm: {height_cm}, age: {age}, gender: {gender}")
+    result = calorie_targets(goal, weight_kg, height_cm, age, gender)
+    logger.debug(f"calculate_calories result: {result}")
+    return compact_json(result)